@@ -36,6 +36,8 @@ TRAINING_STEP = "training_step.json"
 OPTIMIZER_STATE = "optimizer_state.safetensors"
 OPTIMIZER_PARAM_GROUPS = "optimizer_param_groups.json"
 SCHEDULER_STATE = "scheduler_state.json"
+# normalization stats files, loaded with `lerobot.common.policies.normalize.load_stats`
+STATS_FILE_SUFFIXES = (".safetensors", ".npz")
 
 if "LEROBOT_HOME" in os.environ:
     raise ValueError(
@@ -27,11 +27,23 @@ from lerobot.common.utils.utils import get_channel_first_image_shape
 from lerobot.configs.types import FeatureType, PolicyFeature
 
 
-def preprocess_observation(observations: dict[str, np.ndarray]) -> dict[str, Tensor]:
+def _to_device(tensor: Tensor, device: torch.device | str | None) -> Tensor:
+    if device is not None and torch.device(device).type == "cuda":
+        # Host to device copies are only asynchronous from page-locked memory. The pinned blocks are recycled
+        # by PyTorch's caching host allocator, so this doesn't allocate new page-locked memory at every step.
+        tensor = tensor.pin_memory()
+    return tensor.to(device, non_blocking=True)
+
+
+def preprocess_observation(
+    observations: dict[str, np.ndarray], device: torch.device | str | None = None
+) -> dict[str, Tensor]:
     # TODO(aliberts, rcadene): refactor this to use features from the environment (no hardcoding)
     """Convert environment observation to LeRobot format observation.
     Args:
         observation: Dictionary of observation batches from a Gym vector environment.
+        device: Optional device to put the returned tensors on. Images are moved there before being converted
+            to float, so that the (4x smaller) uint8 images are transferred and the conversion runs on the device.
     Returns:
         Dictionary of observation batches with keys renamed to LeRobot format and values as tensors.
     """
@@ -45,7 +57,7 @@ def preprocess_observation(observations: dict[str, np.ndarray]) -> dict[str, Ten
 
         for imgkey, img in imgs.items():
             # TODO(aliberts, rcadene): use transforms.ToTensor()?
-            img = torch.from_numpy(img)
+            img = _to_device(torch.from_numpy(img), device)
 
             # sanity check that images are channel last
             _, h, w, c = img.shape
@@ -62,13 +74,15 @@ def preprocess_observation(observations: dict[str, np.ndarray]) -> dict[str, Ten
             return_observations[imgkey] = img
 
     if "environment_state" in observations:
-        return_observations["observation.environment_state"] = torch.from_numpy(
-            observations["environment_state"]
-        ).float()
+        return_observations["observation.environment_state"] = _to_device(
+            torch.from_numpy(observations["environment_state"]).float(), device
+        )
 
     # TODO(rcadene): enable pixels only baseline with `obs_type="pixels"` in environment by removing
     # requirement for "agent_pos"
-    return_observations["observation.state"] = torch.from_numpy(observations["agent_pos"]).float()
+    return_observations["observation.state"] = _to_device(
+        torch.from_numpy(observations["agent_pos"]).float(), device
+    )
     return return_observations
 
 
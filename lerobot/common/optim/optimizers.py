@@ -97,7 +97,9 @@ class SGDConfig(OptimizerConfig):
 def save_optimizer_state(optimizer: torch.optim.Optimizer, save_dir: Path) -> None:
     state = optimizer.state_dict()
     param_groups = state.pop("param_groups")
-    flat_state = flatten_dict(state)
+    # The state tensors take the memory format of their parameters (e.g. channels last), while safetensors only
+    # saves contiguous tensors.
+    flat_state = {key: value.contiguous() for key, value in flatten_dict(state).items()}
     save_file(flat_state, save_dir / OPTIMIZER_STATE)
     write_json(param_groups, save_dir / OPTIMIZER_PARAM_GROUPS)
 
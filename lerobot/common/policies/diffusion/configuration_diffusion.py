@@ -14,13 +14,27 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import logging
 from dataclasses import dataclass, field
+from types import MappingProxyType
 
+from lerobot.common.constants import STATS_FILE_SUFFIXES
 from lerobot.common.optim.optimizers import AdamConfig
 from lerobot.common.optim.schedulers import DiffuserSchedulerConfig
 from lerobot.configs.policies import PreTrainedConfig
 from lerobot.configs.types import NormalizationMode
 
+# Read-only so that the defaults can't be mutated through a config instance.
+DEFAULT_NORMALIZATION_MAPPING = MappingProxyType(
+    {
+        "VISUAL": NormalizationMode.MEAN_STD,
+        "STATE": NormalizationMode.MIN_MAX,
+        "ACTION": NormalizationMode.MIN_MAX,
+    }
+)
+
+SUPPORTED_PREDICTION_TYPES = ("epsilon", "sample")
+
 
 @PreTrainedConfig.register_subclass("diffusion")
 @dataclass
@@ -63,9 +77,17 @@ class DiffusionConfig(PreTrainedConfig):
             [-1, 1] range.
         output_normalization_modes: Similar dictionary as `normalize_input_modes`, but to unnormalize to the
             original scale. Note that this is also used for normalizing the training targets.
-        vision_backbone: Name of the torchvision resnet backbone to use for encoding images.
+        input_stats_path: Optional path to precomputed normalization statistics for the input features, as a
+            `.safetensors` or `.npz` file with keys like "observation.state/mean". Either a local path or a hub
+            reference of the form "repo_id:path/in/repo". When set and no dataset stats are passed to the policy,
+            the input normalizer is initialized from this file instead.
+        output_stats_path: Same as `input_stats_path`, but for the output features (normalization of the
+            training targets and unnormalization of the predicted actions).
+        vision_backbone: Name of the torchvision resnet backbone to use for encoding images. Supported options:
+            ["resnet18", "resnet34", "resnet50", "resnet101", "resnet152"].
         crop_shape: (H, W) shape to crop images to as a preprocessing step for the vision backbone. Must fit
-            within the image size. If None, no cropping is done.
+            within the image size. If None, no cropping is done. The crop is done inside the model, on the
+            policy's device. Multiples of 8 map better onto the tiled convolution kernels of cuDNN.
         crop_is_random: Whether the crop should be random at training time (it's always a center crop in eval
             mode).
         pretrained_backbone_weights: Pretrained weights from torchvision to initialize the backbone.
@@ -74,17 +96,35 @@ class DiffusionConfig(PreTrainedConfig):
             The group sizes are set to be about 16 (to be precise, feature_dim // 16).
         spatial_softmax_num_keypoints: Number of keypoints for SpatialSoftmax.
         use_separate_rgb_encoders_per_camera: Whether to use a separate RGB encoder for each camera view.
+        use_fused_spatial_softmax: Whether to compute the spatial softmax and its expected keypoint coordinates in
+            a single `torch.compile`d kernel, so that the backbone feature maps are read once instead of twice.
+            Only applied when the policy runs on CUDA. The first calls pay for the compilation.
+        channels_last: Whether to run the vision backbone in the `torch.channels_last` (NHWC) memory format.
+            cuDNN has faster NHWC convolution kernels, especially in reduced precision, so this is only applied
+            when the policy runs on CUDA (on CPU it still works, but there is no speedup to be had).
         down_dims: Feature dimension for each stage of temporal downsampling in the diffusion modeling Unet.
             You may provide a variable number of dimensions, therefore also controlling the degree of
-            downsampling.
+            downsampling. Each dimension must be divisible by `n_groups`, and should be a multiple of 16 to
+            keep the reduced precision (`inference_dtype="bf16"` / `"fp16"`) tensor core kernels aligned.
         kernel_size: The convolutional kernel size of the diffusion modeling Unet.
         n_groups: Number of groups used in the group norm of the Unet's convolutional blocks.
+        fused_group_norm: Whether to compute the group norm and Mish activation of the Unet's convolutional
+            blocks in a single `torch.compile`d kernel. Only applied when the policy runs on CUDA. The first calls
+            pay for the compilation (one graph per distinct `down_dims` entry). Note that this is unrelated to
+            `use_group_norm`, which concerns the vision backbone.
         diffusion_step_embed_dim: The Unet is conditioned on the diffusion timestep via a small non-linear
             network. This is the output dimension of that network, i.e., the embedding dimension.
         use_film_scale_modulation: FiLM (https://arxiv.org/abs/1709.07871) is used for the Unet conditioning.
             Bias modulation is used be default, while this parameter indicates whether to also use scale
             modulation.
-        noise_scheduler_type: Name of the noise scheduler to use. Supported options: ["DDPM", "DDIM"].
+        precompute_timestep_embeddings: Whether to compute the diffusion timestep embeddings for all the inference
+            timesteps at once before the reverse diffusion loop, rather than running the diffusion step encoder
+            at every denoising step.
+        noise_scheduler_type: Name of the noise scheduler to use. Supported options: ["DDPM", "DDIM",
+            "DPMSolverMultistep"]. DPM-Solver++ reaches a similar sample quality as DDIM with fewer inference
+            steps. Note that it doesn't support `clip_sample`.
+        solver_order: Order of the DPM-Solver++ multistep solver (1, 2 or 3). Only used with
+            `noise_scheduler_type="DPMSolverMultistep"`.
         num_train_timesteps: Number of diffusion steps for the forward diffusion schedule.
         beta_schedule: Name of the diffusion beta schedule as per DDPMScheduler from Hugging Face diffusers.
         beta_start: Beta value for the first forward-diffusion step.
@@ -96,11 +136,42 @@ class DiffusionConfig(PreTrainedConfig):
             denoising step at inference time. WARNING: you will need to make sure your action-space is
             normalized to fit within this range.
         clip_sample_range: The magnitude of the clipping range as described above.
+        use_edm_preconditioning: Whether to use the EDM formulation (https://arxiv.org/abs/2206.00364) instead of
+            the DDPM/DDIM one: the Unet inputs, outputs and noise level are preconditioned (c_in, c_out, c_skip,
+            c_noise) and sampling follows a Karras sigma schedule with an Euler solver. This typically reaches
+            the same sample quality with far fewer `num_inference_steps`. Requires `beta_schedule="edm_karras"`
+            and `prediction_type="epsilon"`.
+        sigma_data: Standard deviation of the (normalized) action distribution used by the EDM preconditioning.
         num_inference_steps: Number of reverse diffusion steps to use at inference time (steps are evenly
-            spaced). If not provided, this defaults to be the same as `num_train_timesteps`.
+            spaced). If not provided, this defaults to 10 for "DDIM" and to `num_train_timesteps` for "DDPM".
+            Must not exceed `num_train_timesteps`.
+        compile_model: Whether to wrap the diffusion modeling Unet with `torch.compile`. This removes most of
+            the per-step Python and kernel launch overhead of the reverse diffusion loop, at the cost of a slow
+            first call. Only really worth it on CUDA.
+        compile_mode: The `torch.compile` mode to use when `compile_model` is True. Choose from "default",
+            "reduce-overhead" (uses CUDA graphs) or "max-autotune".
+        compile_fullgraph: Whether to require the compiled Unet to be captured as a single graph (raises on
+            graph breaks instead of silently falling back to eager). Requires `compile_model`.
+        compile_dynamic: Whether to let `torch.compile` generate dynamic-shape kernels. Leave it False when the
+            batch size, horizon and observation shapes are fixed so that a single static graph is reused across
+            all reverse diffusion steps. Note that anything that changes the Unet inputs (e.g. normalization)
+            must happen before the compiled boundary, otherwise it will trigger recompilations.
+        inference_dtype: The dtype the Unet runs in (via autocast) during reverse diffusion. Choose from "fp32",
+            "bf16" or "fp16". Lower precision halves the memory traffic of the Unet's convolution / group norm
+            blocks. Training is not affected. Note that "fp16" has a narrow dynamic range, so it is only safe
+            when the action space is normalized (see `clip_sample`).
         do_mask_loss_for_padding: Whether to mask the loss when there are copy-padded actions. See
             `LeRobotDataset` and `load_previous_and_future_frames` for more information. Note, this defaults
             to False as the original Diffusion Policy implementation does the same.
+        timestep_sampling: How the noise level of each training sample is drawn. "uniform" draws timesteps
+            uniformly (the original Diffusion Policy behavior). "lognormal" draws z ~ N(`timestep_mean`,
+            `timestep_std`²) and uses sigmoid(z) as the normalized timestep (or σ = exp(z) with EDM
+            preconditioning). "normal" draws the normalized timestep from N(`timestep_mean`, `timestep_std`²)
+            truncated to [0, 1]. The non-uniform options concentrate training on the lower noise levels, which
+            usually speeds up convergence.
+        timestep_mean: Mean of the normal distribution used by the non-uniform `timestep_sampling` options.
+        timestep_std: Standard deviation of the normal distribution used by the non-uniform
+            `timestep_sampling` options.
     """
 
     # Inputs / output structure.
@@ -109,12 +180,11 @@ class DiffusionConfig(PreTrainedConfig):
     n_action_steps: int = 8
 
     normalization_mapping: dict[str, NormalizationMode] = field(
-        default_factory=lambda: {
-            "VISUAL": NormalizationMode.MEAN_STD,
-            "STATE": NormalizationMode.MIN_MAX,
-            "ACTION": NormalizationMode.MIN_MAX,
-        }
+        default_factory=lambda: dict(DEFAULT_NORMALIZATION_MAPPING)
     )
+    # Normalization
+    input_stats_path: str | None = None
+    output_stats_path: str | None = None
 
     # The original implementation doesn't sample frames for the last 7 steps,
     # which avoids excessive padding and leads to improved training results.
@@ -129,14 +199,19 @@ class DiffusionConfig(PreTrainedConfig):
     use_group_norm: bool = True
     spatial_softmax_num_keypoints: int = 32
     use_separate_rgb_encoder_per_camera: bool = False
+    use_fused_spatial_softmax: bool = False
+    channels_last: bool = True
     # Unet.
     down_dims: tuple[int, ...] = (512, 1024, 2048)
     kernel_size: int = 5
     n_groups: int = 8
+    fused_group_norm: bool = False
     diffusion_step_embed_dim: int = 128
     use_film_scale_modulation: bool = True
+    precompute_timestep_embeddings: bool = True
     # Noise scheduler.
     noise_scheduler_type: str = "DDPM"
+    solver_order: int = 2
     num_train_timesteps: int = 100
     beta_schedule: str = "squaredcos_cap_v2"
     beta_start: float = 0.0001
@@ -144,12 +219,22 @@ class DiffusionConfig(PreTrainedConfig):
     prediction_type: str = "epsilon"
     clip_sample: bool = True
     clip_sample_range: float = 1.0
+    use_edm_preconditioning: bool = False
+    sigma_data: float = 0.5
 
     # Inference
     num_inference_steps: int | None = None
+    compile_model: bool = False
+    compile_mode: str = "reduce-overhead"
+    compile_fullgraph: bool = False
+    compile_dynamic: bool = False
+    inference_dtype: str = "fp32"
 
     # Loss computation
     do_mask_loss_for_padding: bool = False
+    timestep_sampling: str = "uniform"
+    timestep_mean: float = -0.4
+    timestep_std: float = 1.2
 
     # Training presets
     optimizer_lr: float = 1e-4
@@ -162,23 +247,104 @@ class DiffusionConfig(PreTrainedConfig):
     def __post_init__(self):
         super().__post_init__()
 
+        # Shapes may come in as lists (e.g. from json or keyword arguments). Store them as (hashable) tuples.
+        self.down_dims = tuple(self.down_dims)
+        if self.crop_shape is not None:
+            self.crop_shape = tuple(self.crop_shape)
+
         """Input validation (not exhaustive)."""
-        if not self.vision_backbone.startswith("resnet"):
+        for name in ("input_stats_path", "output_stats_path"):
+            path = getattr(self, name)
+            if path is None:
+                continue
+            # The file itself is only looked up when the policy is created from scratch: pretrained policies
+            # carry their stats in their state dict, and the file may not exist on the machine loading them.
+            if not path.endswith(STATS_FILE_SUFFIXES):
+                raise ValueError(f"`{name}` must point to one of {STATS_FILE_SUFFIXES} files. Got {path}.")
+
+        supported_vision_backbones = ["resnet18", "resnet34", "resnet50", "resnet101", "resnet152"]
+        if self.vision_backbone not in supported_vision_backbones:
             raise ValueError(
-                f"`vision_backbone` must be one of the ResNet variants. Got {self.vision_backbone}."
+                f"`vision_backbone` must be one of {supported_vision_backbones}. Got {self.vision_backbone}."
+            )
+
+        if self.crop_shape is not None and (self.crop_shape[0] % 8 or self.crop_shape[1] % 8):
+            logging.info(
+                f"`crop_shape` {self.crop_shape} is not a multiple of 8, which may lead to slower convolutions."
             )
 
-        supported_prediction_types = ["epsilon", "sample"]
-        if self.prediction_type not in supported_prediction_types:
+        if self.prediction_type not in SUPPORTED_PREDICTION_TYPES:
             raise ValueError(
-                f"`prediction_type` must be one of {supported_prediction_types}. Got {self.prediction_type}."
+                f"`prediction_type` must be one of {SUPPORTED_PREDICTION_TYPES}. Got {self.prediction_type}."
             )
-        supported_noise_schedulers = ["DDPM", "DDIM"]
+        supported_noise_schedulers = ["DDPM", "DDIM", "DPMSolverMultistep"]
         if self.noise_scheduler_type not in supported_noise_schedulers:
             raise ValueError(
                 f"`noise_scheduler_type` must be one of {supported_noise_schedulers}. "
                 f"Got {self.noise_scheduler_type}."
             )
+        if self.solver_order not in [1, 2, 3]:
+            raise ValueError(f"`solver_order` must be one of [1, 2, 3]. Got {self.solver_order}.")
+        supported_compile_modes = ["default", "reduce-overhead", "max-autotune"]
+        if self.compile_mode not in supported_compile_modes:
+            raise ValueError(
+                f"`compile_mode` must be one of {supported_compile_modes}. Got {self.compile_mode}."
+            )
+        supported_inference_dtypes = ["fp32", "bf16", "fp16"]
+        if self.inference_dtype not in supported_inference_dtypes:
+            raise ValueError(
+                f"`inference_dtype` must be one of {supported_inference_dtypes}. Got {self.inference_dtype}."
+            )
+        if self.compile_fullgraph and not self.compile_model:
+            raise ValueError("`compile_fullgraph` can only be used together with `compile_model`.")
+        if self.compile_model and self.device != "cuda":
+            logging.warning(
+                f"`compile_model` is enabled but the policy runs on '{self.device}'. Expect little to no speedup."
+            )
+
+        if self.use_edm_preconditioning != (self.beta_schedule == "edm_karras"):
+            raise ValueError(
+                "`use_edm_preconditioning` must be used together with `beta_schedule='edm_karras'` (and vice "
+                f"versa). Got {self.use_edm_preconditioning=} and {self.beta_schedule=}."
+            )
+        if self.use_edm_preconditioning and self.prediction_type != "epsilon":
+            raise ValueError(
+                f"`use_edm_preconditioning` requires `prediction_type='epsilon'`. Got {self.prediction_type}."
+            )
+        if self.sigma_data <= 0:
+            raise ValueError(f"`sigma_data` must be strictly positive. Got {self.sigma_data}.")
+        supported_timestep_samplings = ["uniform", "lognormal", "normal"]
+        if self.timestep_sampling not in supported_timestep_samplings:
+            raise ValueError(
+                f"`timestep_sampling` must be one of {supported_timestep_samplings}. "
+                f"Got {self.timestep_sampling}."
+            )
+        if self.timestep_std <= 0:
+            raise ValueError(f"`timestep_std` must be strictly positive. Got {self.timestep_std}.")
+
+        if self.num_inference_steps is None:
+            # DDIM, DPM-Solver++ and EDM are designed to skip steps, so a handful of them is enough.
+            few_steps = self.noise_scheduler_type != "DDPM" or self.use_edm_preconditioning
+            self.num_inference_steps = 10 if few_steps else self.num_train_timesteps
+        elif (
+            self.noise_scheduler_type == "DDPM"
+            and not self.use_edm_preconditioning
+            and self.num_inference_steps > 50
+        ):
+            logging.warning(
+                f"Running {self.num_inference_steps} inference steps with DDPM. Consider using "
+                "`noise_scheduler_type='DDIM'` with fewer `num_inference_steps` for much faster inference."
+            )
+        elif self.noise_scheduler_type == "DDIM" and self.num_inference_steps < 10:
+            logging.info(
+                f"Running only {self.num_inference_steps} inference steps with DDIM. Consider using "
+                "`noise_scheduler_type='DPMSolverMultistep'` which is more accurate at low step counts."
+            )
+        if self.num_inference_steps > self.num_train_timesteps:
+            raise ValueError(
+                "`num_inference_steps` can't be greater than `num_train_timesteps`. Got "
+                f"{self.num_inference_steps=} and {self.num_train_timesteps=}."
+            )
 
         # Check that the horizon size and U-Net downsampling is compatible.
         # U-Net downsamples by 2 with each stage.
@@ -188,6 +354,16 @@ class DiffusionConfig(PreTrainedConfig):
                 "The horizon should be an integer multiple of the downsampling factor (which is determined "
                 f"by `len(down_dims)`). Got {self.horizon=} and {self.down_dims=}"
             )
+        if any(d % self.n_groups for d in self.down_dims):
+            raise ValueError(
+                f"Each of `down_dims` must be divisible by `n_groups` for the Unet's group norm. Got "
+                f"{self.down_dims=} and {self.n_groups=}."
+            )
+        if any(d % 16 for d in self.down_dims):
+            logging.warning(
+                f"`down_dims` {self.down_dims} are not all multiples of 16, which prevents using tensor cores "
+                "efficiently in reduced precision."
+            )
 
     def get_optimizer_preset(self) -> AdamConfig:
         return AdamConfig(
@@ -207,9 +383,16 @@ class DiffusionConfig(PreTrainedConfig):
         if len(self.image_features) == 0 and self.env_state_feature is None:
             raise ValueError("You must provide at least one image or the environment state among the inputs.")
 
+        # `self.image_features` is rebuilt on every access, so only build it once here.
+        image_features = self.image_features
+        if not image_features:
+            return
+
         if self.crop_shape is not None:
-            for key, image_ft in self.image_features.items():
-                if self.crop_shape[0] > image_ft.shape[1] or self.crop_shape[1] > image_ft.shape[2]:
+            crop_h, crop_w = self.crop_shape
+            for key, image_ft in image_features.items():
+                _, h, w = image_ft.shape
+                if crop_h > h or crop_w > w:
                     raise ValueError(
                         f"`crop_shape` should fit within the images shapes. Got {self.crop_shape} "
                         f"for `crop_shape` and {image_ft.shape} for "
@@ -217,8 +400,8 @@ class DiffusionConfig(PreTrainedConfig):
                     )
 
         # Check that all input images have the same shape.
-        first_image_key, first_image_ft = next(iter(self.image_features.items()))
-        for key, image_ft in self.image_features.items():
+        first_image_key, first_image_ft = next(iter(image_features.items()))
+        for key, image_ft in image_features.items():
             if image_ft.shape != first_image_ft.shape:
                 raise ValueError(
                     f"`{key}` does not match `{first_image_key}`, but we expect all image shapes to match."
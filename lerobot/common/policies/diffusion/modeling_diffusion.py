@@ -31,11 +31,13 @@ import torch.nn.functional as F  # noqa: N812
 import torchvision
 from diffusers.schedulers.scheduling_ddim import DDIMScheduler
 from diffusers.schedulers.scheduling_ddpm import DDPMScheduler
+from diffusers.schedulers.scheduling_dpmsolver_multistep import DPMSolverMultistepScheduler
+from diffusers.schedulers.scheduling_edm_euler import EDMEulerScheduler
 from torch import Tensor, nn
 
 from lerobot.common.constants import OBS_ENV_STATE, OBS_STATE
 from lerobot.common.policies.diffusion.configuration_diffusion import DiffusionConfig
-from lerobot.common.policies.normalize import Normalize, Unnormalize
+from lerobot.common.policies.normalize import Normalize, Unnormalize, load_stats
 from lerobot.common.policies.pretrained import PreTrainedPolicy
 from lerobot.common.policies.utils import (
     get_device_from_parameters,
@@ -43,6 +45,7 @@ from lerobot.common.policies.utils import (
     get_output_shape,
     populate_queues,
 )
+from lerobot.configs.types import NormalizationMode, PolicyFeature
 
 
 class DiffusionPolicy(PreTrainedPolicy):
@@ -63,19 +66,34 @@ class DiffusionPolicy(PreTrainedPolicy):
         Args:
             config: Policy configuration class instance or None, in which case the default instantiation of
                 the configuration class is used.
-            dataset_stats: Dataset statistics to be used for normalization. If not passed here, it is expected
-                that they will be passed with a call to `load_state_dict` before the policy is used.
+            dataset_stats: Dataset statistics to be used for normalization. If not passed here, they are loaded
+                from `config.input_stats_path` / `config.output_stats_path` when set (except for pretrained
+                policies, which get them from their state dict), otherwise it is expected that they will be
+                passed with a call to `load_state_dict` before the policy is used.
         """
         super().__init__(config)
         config.validate_features()
         self.config = config
+        # `config.image_features` is rebuilt on every access, so look the image keys up once.
+        self._image_keys = tuple(config.image_features)
+
+        input_stats = output_stats = dataset_stats
+        if dataset_stats is None and not config.pretrained_path:
+            if config.input_stats_path:
+                input_stats = load_stats(
+                    config.input_stats_path,
+                    _normalized_keys(config.input_features, config.normalization_mapping),
+                )
+            if config.output_stats_path:
+                output_stats = load_stats(
+                    config.output_stats_path,
+                    _normalized_keys(config.output_features, config.normalization_mapping),
+                )
 
-        self.normalize_inputs = Normalize(config.input_features, config.normalization_mapping, dataset_stats)
-        self.normalize_targets = Normalize(
-            config.output_features, config.normalization_mapping, dataset_stats
-        )
+        self.normalize_inputs = Normalize(config.input_features, config.normalization_mapping, input_stats)
+        self.normalize_targets = Normalize(config.output_features, config.normalization_mapping, output_stats)
         self.unnormalize_outputs = Unnormalize(
-            config.output_features, config.normalization_mapping, dataset_stats
+            config.output_features, config.normalization_mapping, output_stats
         )
 
         # queues are populated during rollout of the policy, they contain the n latest observations and actions
@@ -94,7 +112,7 @@ class DiffusionPolicy(PreTrainedPolicy):
             "observation.state": deque(maxlen=self.config.n_obs_steps),
             "action": deque(maxlen=self.config.n_action_steps),
         }
-        if self.config.image_features:
+        if self._image_keys:
             self._queues["observation.images"] = deque(maxlen=self.config.n_obs_steps)
         if self.config.env_state_feature:
             self._queues["observation.environment_state"] = deque(maxlen=self.config.n_obs_steps)
@@ -122,11 +140,9 @@ class DiffusionPolicy(PreTrainedPolicy):
         actually measured from the first observation which (if `n_obs_steps` > 1) happened in the past.
         """
         batch = self.normalize_inputs(batch)
-        if self.config.image_features:
+        if self._image_keys:
             batch = dict(batch)  # shallow copy so that adding a key doesn't modify the original
-            batch["observation.images"] = torch.stack(
-                [batch[key] for key in self.config.image_features], dim=-4
-            )
+            batch["observation.images"] = torch.stack([batch[key] for key in self._image_keys], dim=-4)
         # Note: It's important that this happens after stacking the images into a single key.
         self._queues = populate_queues(self._queues, batch)
 
@@ -146,26 +162,43 @@ class DiffusionPolicy(PreTrainedPolicy):
     def forward(self, batch: dict[str, Tensor]) -> tuple[Tensor, None]:
         """Run the batch through the model and compute the loss for training or validation."""
         batch = self.normalize_inputs(batch)
-        if self.config.image_features:
+        if self._image_keys:
             batch = dict(batch)  # shallow copy so that adding a key doesn't modify the original
-            batch["observation.images"] = torch.stack(
-                [batch[key] for key in self.config.image_features], dim=-4
-            )
+            batch["observation.images"] = torch.stack([batch[key] for key in self._image_keys], dim=-4)
         batch = self.normalize_targets(batch)
         loss = self.diffusion.compute_loss(batch)
         # no output_dict so returning None
         return loss, None
 
 
-def _make_noise_scheduler(name: str, **kwargs: dict) -> DDPMScheduler | DDIMScheduler:
+_INFERENCE_DTYPES = {"fp32": torch.float32, "bf16": torch.bfloat16, "fp16": torch.float16}
+
+
+def _normalized_keys(features: dict[str, PolicyFeature], norm_map: dict[str, NormalizationMode]) -> list[str]:
+    """Keys of the features that need normalization statistics."""
+    return [
+        key
+        for key, ft in features.items()
+        if norm_map.get(ft.type, NormalizationMode.IDENTITY) is not NormalizationMode.IDENTITY
+    ]
+
+
+def _make_noise_scheduler(
+    name: str, solver_order: int = 2, **kwargs: dict
+) -> DDPMScheduler | DDIMScheduler | DPMSolverMultistepScheduler:
     """
     Factory for noise scheduler instances of the requested type. All kwargs are passed
-    to the scheduler.
+    to the scheduler. `solver_order` is only used by DPM-Solver++.
     """
     if name == "DDPM":
         return DDPMScheduler(**kwargs)
     elif name == "DDIM":
         return DDIMScheduler(**kwargs)
+    elif name == "DPMSolverMultistep":
+        # DPM-Solver++ has no sample clipping.
+        kwargs.pop("clip_sample", None)
+        kwargs.pop("clip_sample_range", None)
+        return DPMSolverMultistepScheduler(solver_order=solver_order, **kwargs)
     else:
         raise ValueError(f"Unsupported noise scheduler type {name}")
 
@@ -175,6 +208,10 @@ class DiffusionModel(nn.Module):
         super().__init__()
         self.config = config
 
+        # Looked up once as the config properties are rebuilt on every access.
+        self._use_images = bool(config.image_features)
+        self._use_env_state = config.env_state_feature is not None
+
         # Build observation encoders (depending on which observations are provided).
         global_cond_dim = self.config.robot_state_feature.shape[0]
         if self.config.image_features:
@@ -190,22 +227,35 @@ class DiffusionModel(nn.Module):
             global_cond_dim += self.config.env_state_feature.shape[0]
 
         self.unet = DiffusionConditionalUnet1d(config, global_cond_dim=global_cond_dim * config.n_obs_steps)
+        if config.compile_model:
+            # Compile in place (rather than wrapping with `torch.compile`) so that the state dict keys stay the
+            # same and checkpoints remain interchangeable between compiled and eager models.
+            self.unet.compile(
+                mode=config.compile_mode,
+                fullgraph=config.compile_fullgraph,
+                dynamic=config.compile_dynamic,
+            )
 
-        self.noise_scheduler = _make_noise_scheduler(
-            config.noise_scheduler_type,
-            num_train_timesteps=config.num_train_timesteps,
-            beta_start=config.beta_start,
-            beta_end=config.beta_end,
-            beta_schedule=config.beta_schedule,
-            clip_sample=config.clip_sample,
-            clip_sample_range=config.clip_sample_range,
-            prediction_type=config.prediction_type,
-        )
-
-        if config.num_inference_steps is None:
-            self.num_inference_steps = self.noise_scheduler.config.num_train_timesteps
+        if config.use_edm_preconditioning:
+            self.noise_scheduler = EDMEulerScheduler(
+                sigma_data=config.sigma_data,
+                num_train_timesteps=config.num_train_timesteps,
+                prediction_type=config.prediction_type,
+            )
         else:
-            self.num_inference_steps = config.num_inference_steps
+            self.noise_scheduler = _make_noise_scheduler(
+                config.noise_scheduler_type,
+                solver_order=config.solver_order,
+                num_train_timesteps=config.num_train_timesteps,
+                beta_start=config.beta_start,
+                beta_end=config.beta_end,
+                beta_schedule=config.beta_schedule,
+                clip_sample=config.clip_sample,
+                clip_sample_range=config.clip_sample_range,
+                prediction_type=config.prediction_type,
+            )
+
+        self.num_inference_steps = config.num_inference_steps
 
     # ========= inference  ============
     def conditional_sample(
@@ -221,16 +271,38 @@ class DiffusionModel(nn.Module):
             device=device,
             generator=generator,
         )
+        # Scale the prior to the initial noise level (this is a no-op for DDPM/DDIM).
+        sample = sample * self.noise_scheduler.init_noise_sigma
 
         self.noise_scheduler.set_timesteps(self.num_inference_steps)
 
-        for t in self.noise_scheduler.timesteps:
+        # Optionally run the Unet in reduced precision. The noise scheduler update stays in full precision.
+        unet_autocast = torch.autocast(
+            device_type=device.type,
+            dtype=_INFERENCE_DTYPES[self.config.inference_dtype],
+            enabled=self.config.inference_dtype != "fp32",
+        )
+
+        # The timesteps are fixed for a given number of inference steps, so their embeddings can be computed in
+        # one batched call instead of once per denoising step.
+        timesteps_embeds = None
+        if self.config.precompute_timestep_embeddings:
+            with unet_autocast:
+                timesteps_embeds = self.unet.diffusion_step_encoder(self.noise_scheduler.timesteps.to(device))
+
+        for i, t in enumerate(self.noise_scheduler.timesteps):
             # Predict model output.
-            model_output = self.unet(
-                sample,
-                torch.full(sample.shape[:1], t, dtype=torch.long, device=sample.device),
-                global_cond=global_cond,
-            )
+            # Precondition the Unet input (EDM's c_in, this is a no-op for DDPM/DDIM).
+            model_input = self.noise_scheduler.scale_model_input(sample, t)
+            with unet_autocast:
+                model_output = self.unet(
+                    model_input,
+                    torch.full(sample.shape[:1], t, dtype=t.dtype, device=sample.device),
+                    global_cond=global_cond,
+                    timesteps_embed=(
+                        timesteps_embeds[i].expand(batch_size, -1) if timesteps_embeds is not None else None
+                    ),
+                )
             # Compute previous image: x_t -> x_t-1
             sample = self.noise_scheduler.step(model_output, t, sample, generator=generator).prev_sample
 
@@ -241,7 +313,7 @@ class DiffusionModel(nn.Module):
         batch_size, n_obs_steps = batch[OBS_STATE].shape[:2]
         global_cond_feats = [batch[OBS_STATE]]
         # Extract image features.
-        if self.config.image_features:
+        if self._use_images:
             if self.config.use_separate_rgb_encoder_per_camera:
                 # Combine batch and sequence dims while rearranging to make the camera index dimension first.
                 images_per_camera = einops.rearrange(batch["observation.images"], "b s n ... -> n (b s) ...")
@@ -268,7 +340,7 @@ class DiffusionModel(nn.Module):
                 )
             global_cond_feats.append(img_features)
 
-        if self.config.env_state_feature:
+        if self._use_env_state:
             global_cond_feats.append(batch[OBS_ENV_STATE])
 
         # Concatenate features then flatten to (B, global_cond_dim).
@@ -288,7 +360,8 @@ class DiffusionModel(nn.Module):
         batch_size, n_obs_steps = batch["observation.state"].shape[:2]
         assert n_obs_steps == self.config.n_obs_steps
 
-        # Encode image features and concatenate them all together along with the state vector.
+        # Encode image features and concatenate them all together along with the state vector. The observations
+        # don't change during reverse diffusion, so this is done once and reused for every denoising step.
         global_cond = self._prepare_global_conditioning(batch)  # (B, global_cond_dim)
 
         # run sampling
@@ -330,27 +403,35 @@ class DiffusionModel(nn.Module):
         trajectory = batch["action"]
         # Sample noise to add to the trajectory.
         eps = torch.randn(trajectory.shape, device=trajectory.device)
-        # Sample a random noising timestep for each item in the batch.
-        timesteps = torch.randint(
-            low=0,
-            high=self.noise_scheduler.config.num_train_timesteps,
-            size=(trajectory.shape[0],),
-            device=trajectory.device,
-        ).long()
-        # Add noise to the clean trajectories according to the noise magnitude at each timestep.
-        noisy_trajectory = self.noise_scheduler.add_noise(trajectory, eps, timesteps)
-
-        # Run the denoising network (that might denoise the trajectory, or attempt to predict the noise).
-        pred = self.unet(noisy_trajectory, timesteps, global_cond=global_cond)
-
-        # Compute the loss.
-        # The target is either the original trajectory, or the noise.
-        if self.config.prediction_type == "epsilon":
-            target = eps
-        elif self.config.prediction_type == "sample":
-            target = batch["action"]
+        if self.config.use_edm_preconditioning:
+            pred, target = self._edm_prediction_and_target(trajectory, eps, global_cond)
         else:
-            raise ValueError(f"Unsupported prediction type {self.config.prediction_type}")
+            # Sample a random noising timestep for each item in the batch.
+            num_train_timesteps = self.noise_scheduler.config.num_train_timesteps
+            if self.config.timestep_sampling == "uniform":
+                timesteps = torch.randint(
+                    low=0,
+                    high=num_train_timesteps,
+                    size=(trajectory.shape[0],),
+                    device=trajectory.device,
+                ).long()
+            else:
+                noise_levels = self._sample_noise_levels(trajectory.shape[0], trajectory.device)
+                timesteps = (noise_levels * num_train_timesteps).long().clamp(max=num_train_timesteps - 1)
+            # Add noise to the clean trajectories according to the noise magnitude at each timestep.
+            noisy_trajectory = self.noise_scheduler.add_noise(trajectory, eps, timesteps)
+
+            # Run the denoising network (that might denoise the trajectory, or attempt to predict the noise).
+            pred = self.unet(noisy_trajectory, timesteps, global_cond=global_cond)
+
+            # Compute the loss.
+            # The target is either the original trajectory, or the noise.
+            if self.config.prediction_type == "epsilon":
+                target = eps
+            elif self.config.prediction_type == "sample":
+                target = batch["action"]
+            else:
+                raise ValueError(f"Unsupported prediction type {self.config.prediction_type}")
 
         loss = F.mse_loss(pred, target, reduction="none")
 
@@ -366,6 +447,78 @@ class DiffusionModel(nn.Module):
 
         return loss.mean()
 
+    def _sample_noise_levels(self, batch_size: int, device: torch.device) -> Tensor:
+        """Sample (B,) normalized noise levels in [0, 1] (0 being noise-free) as per `timestep_sampling`."""
+        if self.config.timestep_sampling == "uniform":
+            return torch.rand(batch_size, device=device)
+        elif self.config.timestep_sampling == "lognormal":
+            z = torch.randn(batch_size, device=device) * self.config.timestep_std + self.config.timestep_mean
+            return torch.sigmoid(z)
+        elif self.config.timestep_sampling == "normal":
+            return nn.init.trunc_normal_(
+                torch.empty(batch_size, device=device),
+                mean=self.config.timestep_mean,
+                std=self.config.timestep_std,
+                a=0.0,
+                b=1.0,
+            )
+        else:
+            raise ValueError(f"Unsupported timestep sampling {self.config.timestep_sampling}")
+
+    def _edm_prediction_and_target(
+        self, trajectory: Tensor, eps: Tensor, global_cond: Tensor
+    ) -> tuple[Tensor, Tensor]:
+        """Run the preconditioned Unet on a noised trajectory as per EDM (https://arxiv.org/abs/2206.00364).
+
+        The EDM loss λ(σ) * ||c_skip * x_noisy + c_out * F(c_in * x_noisy, c_noise) - x||² is rewritten as a
+        plain MSE between the raw Unet output F and an effective target (x - c_skip * x_noisy) / c_out, since
+        λ(σ) = 1 / c_out² by construction. This lets the caller share the loss computation with DDPM/DDIM.
+
+        Returns:
+            The (B, horizon, action_dim) Unet prediction and matching target.
+        """
+        if self.config.timestep_sampling == "lognormal":
+            # ln(σ) ~ N(P_mean, P_std²) as in the EDM paper.
+            sigmas = torch.exp(
+                torch.randn(trajectory.shape[0], device=trajectory.device) * self.config.timestep_std
+                + self.config.timestep_mean
+            )
+        else:
+            # Map the sampled noise levels onto the Karras ramp used at inference time (the ramp goes from
+            # sigma_max to sigma_min).
+            scheduler_cfg = self.noise_scheduler.config
+            ramp = 1 - self._sample_noise_levels(trajectory.shape[0], trajectory.device)
+            min_inv_rho = scheduler_cfg.sigma_min ** (1 / scheduler_cfg.rho)
+            max_inv_rho = scheduler_cfg.sigma_max ** (1 / scheduler_cfg.rho)
+            sigmas = (max_inv_rho + ramp * (min_inv_rho - max_inv_rho)) ** scheduler_cfg.rho
+        # (B,) -> (B, 1, 1) for broadcasting.
+        sigmas_bcast = sigmas[:, None, None]
+
+        noisy_trajectory = trajectory + eps * sigmas_bcast
+        c_skip = self.config.sigma_data**2 / (sigmas_bcast**2 + self.config.sigma_data**2)
+        c_out = sigmas_bcast * self.config.sigma_data / (sigmas_bcast**2 + self.config.sigma_data**2) ** 0.5
+
+        pred = self.unet(
+            self.noise_scheduler.precondition_inputs(noisy_trajectory, sigmas_bcast),
+            self.noise_scheduler.precondition_noise(sigmas),
+            global_cond=global_cond,
+        )
+        target = (trajectory - c_skip * noisy_trajectory) / c_out
+        return pred, target
+
+
+def _spatial_softmax_expected_xy(features: Tensor, pos_grid: Tensor) -> Tensor:
+    # 2d softmax normalization
+    attention = F.softmax(features, dim=-1)
+    # [B * K, H * W] x [H * W, 2] -> [B * K, 2] for spatial coordinate mean in x and y dimensions
+    return attention @ pos_grid
+
+
+# Lets Inductor fuse the softmax with the coordinate reduction so that the feature maps are only read once.
+# Compiled with dynamic shapes so that the batch size changes (training, last partial batch, evaluation, single
+# observation) don't each trigger a recompilation.
+_fused_spatial_softmax_expected_xy = torch.compile(_spatial_softmax_expected_xy, dynamic=True)
+
 
 class SpatialSoftmax(nn.Module):
     """
@@ -390,13 +543,15 @@ class SpatialSoftmax(nn.Module):
     linear mapping (in_channels, H, W) -> (num_kp, H, W).
     """
 
-    def __init__(self, input_shape, num_kp=None):
+    def __init__(self, input_shape, num_kp=None, fused=False):
         """
         Args:
             input_shape (list): (C, H, W) input feature map shape.
             num_kp (int): number of keypoints in output. If None, output will have the same number of channels as input.
+            fused (bool): whether to compute the softmax and the expected coordinates in a single compiled kernel.
         """
         super().__init__()
+        self._expected_xy = _fused_spatial_softmax_expected_xy if fused else _spatial_softmax_expected_xy
 
         assert len(input_shape) == 3
         self._in_c, self._in_h, self._in_w = input_shape
@@ -428,10 +583,7 @@ class SpatialSoftmax(nn.Module):
 
         # [B, K, H, W] -> [B * K, H * W] where K is number of keypoints
         features = features.reshape(-1, self._in_h * self._in_w)
-        # 2d softmax normalization
-        attention = F.softmax(features, dim=-1)
-        # [B * K, H * W] x [H * W, 2] -> [B * K, 2] for spatial coordinate mean in x and y dimensions
-        expected_xy = attention @ self.pos_grid
+        expected_xy = self._expected_xy(features, self.pos_grid)
         # reshape to [B, K, 2]
         feature_keypoints = expected_xy.view(-1, self._out_c, 2)
 
@@ -476,6 +628,10 @@ class DiffusionRgbEncoder(nn.Module):
                 func=lambda x: nn.GroupNorm(num_groups=x.num_features // 16, num_channels=x.num_features),
             )
 
+        self.channels_last = config.channels_last and config.device == "cuda"
+        if self.channels_last:
+            self.backbone = self.backbone.to(memory_format=torch.channels_last)
+
         # Set up pooling and final layers.
         # Use a dry run to get the feature map shape.
         # The dummy input should take the number of image channels from `config.image_features` and it should
@@ -488,7 +644,11 @@ class DiffusionRgbEncoder(nn.Module):
         dummy_shape = (1, images_shape[0], *dummy_shape_h_w)
         feature_map_shape = get_output_shape(self.backbone, dummy_shape)[1:]
 
-        self.pool = SpatialSoftmax(feature_map_shape, num_kp=config.spatial_softmax_num_keypoints)
+        self.pool = SpatialSoftmax(
+            feature_map_shape,
+            num_kp=config.spatial_softmax_num_keypoints,
+            fused=config.use_fused_spatial_softmax and config.device == "cuda",
+        )
         self.feature_dim = config.spatial_softmax_num_keypoints * 2
         self.out = nn.Linear(config.spatial_softmax_num_keypoints * 2, self.feature_dim)
         self.relu = nn.ReLU()
@@ -507,6 +667,8 @@ class DiffusionRgbEncoder(nn.Module):
             else:
                 # Always use center crop for eval.
                 x = self.center_crop(x)
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         # Extract backbone feature.
         x = torch.flatten(self.pool(self.backbone(x)), start_dim=1)
         # Final linear layer with non-linearity.
@@ -564,12 +726,25 @@ class DiffusionSinusoidalPosEmb(nn.Module):
         return emb
 
 
+def _group_norm_mish(x: Tensor, num_groups: int, weight: Tensor, bias: Tensor, eps: float) -> Tensor:
+    return F.mish(F.group_norm(x, num_groups, weight, bias, eps))
+
+
+# Lets Inductor fuse the group norm statistics, normalization, affine and activation into a single kernel.
+# All the Unet blocks share this function, so compile it with dynamic shapes rather than one graph per input
+# shape, which would quickly exceed dynamo's recompilation limit and silently fall back to eager. Parameters
+# keep static shapes, so this still compiles one graph per distinct `down_dims` entry (times two, as a batch
+# size of 1 is specialized).
+_fused_group_norm_mish = torch.compile(_group_norm_mish, dynamic=True)
+
+
 class DiffusionConv1dBlock(nn.Module):
     """Conv1d --> GroupNorm --> Mish"""
 
-    def __init__(self, inp_channels, out_channels, kernel_size, n_groups=8):
+    def __init__(self, inp_channels, out_channels, kernel_size, n_groups=8, fused_group_norm=False):
         super().__init__()
 
+        self.fused_group_norm = fused_group_norm
         self.block = nn.Sequential(
             nn.Conv1d(inp_channels, out_channels, kernel_size, padding=kernel_size // 2),
             nn.GroupNorm(n_groups, out_channels),
@@ -577,6 +752,9 @@ class DiffusionConv1dBlock(nn.Module):
         )
 
     def forward(self, x):
+        if self.fused_group_norm:
+            norm = self.block[1]
+            return _fused_group_norm_mish(self.block[0](x), norm.num_groups, norm.weight, norm.bias, norm.eps)
         return self.block(x)
 
 
@@ -608,12 +786,16 @@ class DiffusionConditionalUnet1d(nn.Module):
             zip(config.down_dims[:-1], config.down_dims[1:], strict=True)
         )
 
+        # The fused group norm relies on `torch.compile`, which only pays off on CUDA.
+        fused_group_norm = config.fused_group_norm and config.device == "cuda"
+
         # Unet encoder.
         common_res_block_kwargs = {
             "cond_dim": cond_dim,
             "kernel_size": config.kernel_size,
             "n_groups": config.n_groups,
             "use_film_scale_modulation": config.use_film_scale_modulation,
+            "fused_group_norm": fused_group_norm,
         }
         self.down_modules = nn.ModuleList([])
         for ind, (dim_in, dim_out) in enumerate(in_out):
@@ -658,16 +840,29 @@ class DiffusionConditionalUnet1d(nn.Module):
             )
 
         self.final_conv = nn.Sequential(
-            DiffusionConv1dBlock(config.down_dims[0], config.down_dims[0], kernel_size=config.kernel_size),
+            DiffusionConv1dBlock(
+                config.down_dims[0],
+                config.down_dims[0],
+                kernel_size=config.kernel_size,
+                fused_group_norm=fused_group_norm,
+            ),
             nn.Conv1d(config.down_dims[0], config.action_feature.shape[0], 1),
         )
 
-    def forward(self, x: Tensor, timestep: Tensor | int, global_cond=None) -> Tensor:
+    def forward(
+        self,
+        x: Tensor,
+        timestep: Tensor | int,
+        global_cond=None,
+        timesteps_embed: Tensor | None = None,
+    ) -> Tensor:
         """
         Args:
             x: (B, T, input_dim) tensor for input to the Unet.
             timestep: (B,) tensor of (timestep_we_are_denoising_from - 1).
             global_cond: (B, global_cond_dim)
+            timesteps_embed: Optional (B, diffusion_step_embed_dim) precomputed embedding of `timestep`. If
+                provided, the diffusion step encoder is skipped.
             output: (B, T, input_dim)
         Returns:
             (B, T, input_dim) diffusion model prediction.
@@ -675,7 +870,8 @@ class DiffusionConditionalUnet1d(nn.Module):
         # For 1D convolutions we'll need feature dimension first.
         x = einops.rearrange(x, "b t d -> b d t")
 
-        timesteps_embed = self.diffusion_step_encoder(timestep)
+        if timesteps_embed is None:
+            timesteps_embed = self.diffusion_step_encoder(timestep)
 
         # If there is a global conditioning feature, concatenate it to the timestep embedding.
         if global_cond is not None:
@@ -720,19 +916,24 @@ class DiffusionConditionalResidualBlock1d(nn.Module):
         # Set to True to do scale modulation with FiLM as well as bias modulation (defaults to False meaning
         # FiLM just modulates bias).
         use_film_scale_modulation: bool = False,
+        fused_group_norm: bool = False,
     ):
         super().__init__()
 
         self.use_film_scale_modulation = use_film_scale_modulation
         self.out_channels = out_channels
 
-        self.conv1 = DiffusionConv1dBlock(in_channels, out_channels, kernel_size, n_groups=n_groups)
+        self.conv1 = DiffusionConv1dBlock(
+            in_channels, out_channels, kernel_size, n_groups=n_groups, fused_group_norm=fused_group_norm
+        )
 
         # FiLM modulation (https://arxiv.org/abs/1709.07871) outputs per-channel bias and (maybe) scale.
         cond_channels = out_channels * 2 if use_film_scale_modulation else out_channels
         self.cond_encoder = nn.Sequential(nn.Mish(), nn.Linear(cond_dim, cond_channels))
 
-        self.conv2 = DiffusionConv1dBlock(out_channels, out_channels, kernel_size, n_groups=n_groups)
+        self.conv2 = DiffusionConv1dBlock(
+            out_channels, out_channels, kernel_size, n_groups=n_groups, fused_group_norm=fused_group_norm
+        )
 
         # A final convolution for dimension matching the residual (if needed).
         self.residual_conv = (
@@ -13,12 +13,61 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import re
+from collections.abc import Iterable
+from pathlib import Path
+
 import numpy as np
 import torch
+from huggingface_hub import hf_hub_download
+from safetensors.torch import load_file
 from torch import Tensor, nn
 
 from lerobot.configs.types import FeatureType, NormalizationMode, PolicyFeature
 
+# e.g. "lerobot/diffusion_pusht:stats.safetensors"
+HUB_STATS_REF_PATTERN = re.compile(r"^(?P<repo_id>[\w.-]+/[\w.-]+):(?P<filename>.+)$")
+
+
+def load_stats(path: str, required_keys: Iterable[str] = ()) -> dict[str, dict[str, Tensor]]:
+    """
+    Load precomputed normalization statistics from a `.safetensors` or `.npz` file, so that they don't need to be
+    recomputed from the dataset.
+
+    Args:
+        path: Local path to the file, or a hub reference of the form "repo_id:path/in/repo". Keys are expected
+            to be flattened as "{feature}/{stat}" (e.g. "observation.state/mean").
+        required_keys: Features that the file must hold statistics for.
+
+    Returns:
+        dict: Statistics in the format expected by `Normalize` and `Unnormalize`.
+    """
+    local_path = path
+    if not Path(path).is_file():
+        match = HUB_STATS_REF_PATTERN.match(path)
+        if match is None:
+            raise FileNotFoundError(
+                f"Stats file not found: {path}. Expected an existing file or a hub reference of the form "
+                "'repo_id:path'."
+            )
+        local_path = hf_hub_download(match["repo_id"], match["filename"])
+
+    if str(local_path).endswith(".npz"):
+        with np.load(local_path) as data:
+            flat_stats = {k: torch.from_numpy(data[k]) for k in data.files}
+    else:
+        flat_stats = load_file(local_path)
+
+    stats = {}
+    for flat_key, value in flat_stats.items():
+        key, stat = flat_key.rsplit("/", 1)
+        stats.setdefault(key, {})[stat] = value
+
+    missing_keys = [key for key in required_keys if key not in stats]
+    if missing_keys:
+        raise ValueError(f"Stats file {path} has no statistics for {missing_keys}. Got {list(stats)}.")
+    return stats
+
 
 def create_stats_buffers(
     features: dict[str, PolicyFeature],
@@ -80,14 +129,16 @@ def create_stats_buffers(
 
         # TODO(aliberts, rcadene): harmonize this to only use one framework (np or torch)
         if stats:
-            if isinstance(stats[key]["mean"], np.ndarray):
+            # Stats loaded from a file may only hold the statistics needed by `norm_mode`.
+            stat_value = next(iter(stats[key].values()))
+            if isinstance(stat_value, np.ndarray):
                 if norm_mode is NormalizationMode.MEAN_STD:
                     buffer["mean"].data = torch.from_numpy(stats[key]["mean"]).to(dtype=torch.float32)
                     buffer["std"].data = torch.from_numpy(stats[key]["std"]).to(dtype=torch.float32)
                 elif norm_mode is NormalizationMode.MIN_MAX:
                     buffer["min"].data = torch.from_numpy(stats[key]["min"]).to(dtype=torch.float32)
                     buffer["max"].data = torch.from_numpy(stats[key]["max"]).to(dtype=torch.float32)
-            elif isinstance(stats[key]["mean"], torch.Tensor):
+            elif isinstance(stat_value, torch.Tensor):
                 # Note: The clone is needed to make sure that the logic in save_pretrained doesn't see duplicated
                 # tensors anywhere (for example, when we use the same stats for normalization and
                 # unnormalization). See the logic here
@@ -99,7 +150,7 @@ def create_stats_buffers(
                     buffer["min"].data = stats[key]["min"].clone().to(dtype=torch.float32)
                     buffer["max"].data = stats[key]["max"].clone().to(dtype=torch.float32)
             else:
-                type_ = type(stats[key]["mean"])
+                type_ = type(stat_value)
                 raise ValueError(f"np.ndarray or torch.Tensor expected, but type is '{type_}' instead.")
 
         stats_buffers[key] = buffer
@@ -112,12 +112,13 @@ def predict_action(
     ):
         # Convert to pytorch format: channel first and float32 in [0,1] with batch dimension
         for name in observation:
-            observation[name] = torch.from_numpy(observation[name])
+            # Send the raw array first, so that the images cross to the device as uint8 (4x less to copy than
+            # float32) and are normalized and permuted there.
+            observation[name] = torch.from_numpy(observation[name]).to(device)
             if "image" in name:
                 observation[name] = observation[name].type(torch.float32) / 255
                 observation[name] = observation[name].permute(2, 0, 1).contiguous()
             observation[name] = observation[name].unsqueeze(0)
-            observation[name] = observation[name].to(device)
 
         observation["task"] = task if task else ""
         observation["robot_type"] = robot_type if robot_type else ""
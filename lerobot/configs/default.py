@@ -58,6 +58,12 @@ class EvalConfig:
     batch_size: int = 50
     # `use_async_envs` specifies whether to use asynchronous environments (multiprocessing).
     use_async_envs: bool = False
+    # `dynamic_quantization` specifies whether to quantize the policy's linear layers to int8 (with dynamic
+    # activation quantization) for evaluation. This is only supported on CPU. On GPU, use `policy.use_amp` instead.
+    dynamic_quantization: bool = False
+    # `overlap_rendering` specifies whether to render the video frames on a background thread while the policy
+    # computes the next action. This is only used with synchronous environments.
+    overlap_rendering: bool = False
 
     def __post_init__(self):
         if self.batch_size > self.n_episodes:
@@ -40,6 +40,7 @@ from pprint import pformat
 
 import numpy as np
 import rerun as rr
+import torch
 
 from lerobot.common.cameras import (  # noqa: F401
     CameraConfig,  # noqa: F401
@@ -173,12 +174,13 @@ def record_loop(
     # if policy is given it needs cleaning up
     if policy is not None:
         policy.reset()
+        policy_device = get_safe_torch_device(policy.config.device)
 
     timestamp = 0
     start_episode_t = time.perf_counter()
+    next_tick_t = start_episode_t
+    fell_behind = False
     while timestamp < control_time_s:
-        start_loop_t = time.perf_counter()
-
         observation = robot.get_observation()
 
         if policy is not None or dataset is not None:
@@ -188,12 +190,12 @@ def record_loop(
             action_values = predict_action(
                 observation_frame,
                 policy,
-                get_safe_torch_device(policy.config.device),
+                policy_device,
                 policy.config.use_amp,
                 task=single_task,
                 robot_type=robot.robot_type,
             )
-            action = {key: action_values[i].item() for i, key in enumerate(robot.action_features)}
+            action = dict(zip(robot.action_features, action_values.tolist(), strict=True))
         else:
             action = teleop.get_action()
 
@@ -206,7 +208,9 @@ def record_loop(
             frame = {**observation_frame, **action_frame}
             dataset.add_frame(frame, task=single_task)
 
-        if display_data:
+        # Displaying is best effort: skip it for a tick when the previous one overran, to catch up on the
+        # control period rather than falling further behind.
+        if display_data and not fell_behind:
             for obs, val in observation.items():
                 if isinstance(val, float):
                     rr.log(f"observation.{obs}", rr.Scalar(val))
@@ -216,8 +220,14 @@ def record_loop(
                 if isinstance(val, float):
                     rr.log(f"action.{act}", rr.Scalar(val))
 
-        dt_s = time.perf_counter() - start_loop_t
-        busy_wait(1 / fps - dt_s)
+        # Pace the loop on absolute tick deadlines rather than on each iteration's duration, so that the wait
+        # overshoots and the bookkeeping between iterations don't accumulate into a drift from `fps` (the
+        # dataset timestamps assume `frame_index / fps`). After an overrun, restart from now instead of
+        # rushing through the missed ticks.
+        now = time.perf_counter()
+        fell_behind = now > next_tick_t + 1 / fps
+        next_tick_t = max(next_tick_t + 1 / fps, now)
+        busy_wait(next_tick_t - now)
 
         timestamp = time.perf_counter() - start_episode_t
         if events["exit_early"]:
@@ -272,6 +282,23 @@ def record(cfg: RecordConfig) -> LeRobotDataset:
     if teleop is not None:
         teleop.connect()
 
+    if policy is not None:
+        # The observation shapes are fixed, so cuDNN only autotunes its kernels once.
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        # Trigger the autotuning (and the compilation if enabled) ahead of the first episode, so that it doesn't
+        # eat into the control period. `record_loop` resets the policy, so this doesn't leak into the recorded
+        # actions.
+        logging.info("Warming up policy.")
+        predict_action(
+            build_dataset_frame(dataset.features, robot.get_observation(), prefix="observation"),
+            policy,
+            get_safe_torch_device(policy.config.device),
+            policy.config.use_amp,
+            task=cfg.dataset.single_task,
+            robot_type=robot.robot_type,
+        )
+
     listener, events = init_keyboard_listener()
 
     for recorded_episodes in range(cfg.dataset.num_episodes):
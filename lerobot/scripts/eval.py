@@ -48,25 +48,29 @@ You can learn about the CLI options for this script in the `EvalPipelineConfig`
 
 import json
 import logging
-import threading
+import os
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import nullcontext
-from copy import deepcopy
 from dataclasses import asdict
 from pathlib import Path
 from pprint import pformat
 from typing import Callable
 
-import einops
 import gymnasium as gym
 import numpy as np
 import torch
 from termcolor import colored
 from torch import Tensor, nn
-from tqdm import trange
+from tqdm import tqdm, trange
 
 from lerobot.common.envs.factory import make_env
-from lerobot.common.envs.utils import add_envs_task, check_env_attributes_and_types, preprocess_observation
+from lerobot.common.envs.utils import (
+    _to_device,
+    add_envs_task,
+    check_env_attributes_and_types,
+    preprocess_observation,
+)
 from lerobot.common.policies.factory import make_policy
 from lerobot.common.policies.pretrained import PreTrainedPolicy
 from lerobot.common.policies.utils import get_device_from_parameters
@@ -87,6 +91,8 @@ def rollout(
     seeds: list[int] | None = None,
     return_observations: bool = False,
     render_callback: Callable[[gym.vector.VectorEnv], None] | None = None,
+    progbar: tqdm | None = None,
+    render_executor: ThreadPoolExecutor | None = None,
 ) -> dict:
     """Run a batched policy rollout once through a batch of environments.
 
@@ -116,100 +122,143 @@ def rollout(
             are returned optionally because they typically take more memory to cache. Defaults to False.
         render_callback: Optional rendering callback to be used after the environments are reset, and after
             every step.
+        progbar: Optional progress bar to reuse (it is reset at the start of the rollout). If not provided, a new
+            one is created.
+        render_executor: Optional single-thread executor to run `render_callback` on, while the policy computes
+            the next action. Rendering is always done before the environments are stepped again. Only used with
+            a SyncVectorEnv, as AsyncVectorEnv doesn't allow concurrent calls to its workers. The same executor
+            should be reused across rollouts, since rendering contexts (e.g. MuJoCo's) are bound to the thread
+            that created them.
     Returns:
         The dictionary described above.
     """
     assert isinstance(policy, nn.Module), "Policy must be a PyTorch nn module."
     device = get_device_from_parameters(policy)
 
+    # Rendering only reads the environments' state, so it can overlap with policy inference.
+    if render_callback is None or not isinstance(env, gym.vector.SyncVectorEnv):
+        render_executor = None
+    pending_render: Future | None = None
+
+    def render():
+        nonlocal pending_render
+        if render_executor is not None:
+            pending_render = render_executor.submit(render_callback, env)
+        elif render_callback is not None:
+            render_callback(env)
+
+    # Mixed precision (if enabled) only applies to the policy inference.
+    policy_autocast = torch.autocast(device_type=device.type) if policy.config.use_amp else nullcontext()
+
     # Reset the policy and environments.
     policy.reset()
     observation, info = env.reset(seed=seeds)
-    if render_callback is not None:
-        render_callback(env)
-
-    all_observations = []
-    all_actions = []
-    all_rewards = []
-    all_successes = []
-    all_dones = []
+    render()
 
     step = 0
     # Keep track of which environments are done.
     done = np.array([False] * env.num_envs)
     max_steps = env.call("_max_episode_steps")[0]
-    progbar = trange(
-        max_steps,
-        desc=f"Running rollout with at most {max_steps} steps",
-        disable=inside_slurm(),  # we dont want progress bar when we use slurm, since it clutters the logs
-        leave=False,
-    )
+
+    # The rollout data is written into buffers sized for the longest possible rollout, and sliced to the actual
+    # number of steps at the end. The buffers whose shape and dtype depend on the policy or the environment are
+    # allocated on the first step.
+    all_observations: dict[str, Tensor] = {}
+    all_actions: Tensor | None = None
+    all_rewards: Tensor | None = None
+    all_successes = torch.zeros((env.num_envs, max_steps), dtype=torch.bool)
+    all_dones = torch.zeros((env.num_envs, max_steps), dtype=torch.bool)
+    # Whether each environment succeeded at any point so far, for the running success rate.
+    any_success = np.zeros(env.num_envs, dtype=bool)
+    # Success of each environment at the current step (filled in place).
+    successes = np.zeros(env.num_envs, dtype=bool)
+    progbar_desc = f"Running rollout with at most {max_steps} steps"
+    if progbar is None:
+        progbar = trange(
+            max_steps,
+            desc=progbar_desc,
+            disable=inside_slurm(),  # we dont want progress bar when we use slurm, since it clutters the logs
+            leave=False,
+        )
+    else:
+        progbar.reset(total=max_steps)
+        progbar.set_description(progbar_desc, refresh=False)
     check_env_attributes_and_types(env)
     while not np.all(done):
-        # Numpy array to tensor and changing dictionary keys to LeRobot policy format.
-        observation = preprocess_observation(observation)
         if return_observations:
-            all_observations.append(deepcopy(observation))
-
-        observation = {
-            key: observation[key].to(device, non_blocking=device.type == "cuda") for key in observation
-        }
+            # Preprocess once on the host, record that, and send the same tensors to the policy's device, rather
+            # than preprocessing twice or copying the device tensors back.
+            observation = preprocess_observation(observation)
+            _write_observation(all_observations, observation, step, max_steps + 1)
+            observation = {key: _to_device(value, device) for key, value in observation.items()}
+        else:
+            # Numpy array to tensor on the policy's device and changing dictionary keys to LeRobot policy format.
+            observation = preprocess_observation(observation, device=device)
 
         # Infer "task" from attributes of environments.
         # TODO: works with SyncVectorEnv but not AsyncVectorEnv
         observation = add_envs_task(env, observation)
 
-        with torch.inference_mode():
+        with torch.inference_mode(), policy_autocast:
             action = policy.select_action(observation)
 
         # Convert to CPU / numpy.
         action = action.to("cpu").numpy()
         assert action.ndim == 2, "Action dimensions should be (batch, action_dim)"
 
-        # Apply the next action.
+        # Apply the next action, once the previous frame is rendered.
+        if pending_render is not None:
+            pending_render.result()
         observation, reward, terminated, truncated, info = env.step(action)
-        if render_callback is not None:
-            render_callback(env)
+        render()
 
         # VectorEnv stores is_success in `info["final_info"][env_index]["is_success"]`. "final_info" isn't
-        # available of none of the envs finished.
+        # available if none of the envs finished, and `info["_final_info"]` masks the envs that did.
+        successes[:] = False
         if "final_info" in info:
-            successes = [info["is_success"] if info is not None else False for info in info["final_info"]]
-        else:
-            successes = [False] * env.num_envs
+            for env_index in np.flatnonzero(info["_final_info"]):
+                successes[env_index] = info["final_info"][env_index]["is_success"]
 
         # Keep track of which environments are done so far.
         done = terminated | truncated | done
 
-        all_actions.append(torch.from_numpy(action))
-        all_rewards.append(torch.from_numpy(reward))
-        all_dones.append(torch.from_numpy(done))
-        all_successes.append(torch.tensor(successes))
+        if all_actions is None:
+            all_actions = torch.empty(
+                (env.num_envs, max_steps, *action.shape[1:]), dtype=torch.from_numpy(action).dtype
+            )
+            all_rewards = torch.empty((env.num_envs, max_steps), dtype=torch.from_numpy(reward).dtype)
+        all_actions[:, step] = torch.from_numpy(action)
+        all_rewards[:, step] = torch.from_numpy(reward)
+        all_dones[:, step] = torch.from_numpy(done)
+        all_successes[:, step] = torch.from_numpy(successes)
 
         step += 1
-        running_success_rate = (
-            einops.reduce(torch.stack(all_successes, dim=1), "b n -> b", "any").numpy().mean()
+        any_success |= successes
+        running_success_rate = any_success.mean()
+        # Don't redraw on every step: `update` refreshes the bar (including the postfix) at most every
+        # `mininterval` seconds.
+        progbar.set_postfix(
+            {"running_success_rate": f"{running_success_rate.item() * 100:.1f}%"}, refresh=False
         )
-        progbar.set_postfix({"running_success_rate": f"{running_success_rate.item() * 100:.1f}%"})
         progbar.update()
 
+    if pending_render is not None:
+        pending_render.result()
+
     # Track the final observation.
     if return_observations:
         observation = preprocess_observation(observation)
-        all_observations.append(deepcopy(observation))
+        _write_observation(all_observations, observation, step, max_steps + 1)
 
-    # Stack the sequence along the first dimension so that we have (batch, sequence, *) tensors.
+    # Keep the steps that were actually run, so that we have (batch, sequence, *) tensors.
     ret = {
-        "action": torch.stack(all_actions, dim=1),
-        "reward": torch.stack(all_rewards, dim=1),
-        "success": torch.stack(all_successes, dim=1),
-        "done": torch.stack(all_dones, dim=1),
+        "action": all_actions[:, :step],
+        "reward": all_rewards[:, :step],
+        "success": all_successes[:, :step],
+        "done": all_dones[:, :step],
     }
     if return_observations:
-        stacked_observations = {}
-        for key in all_observations[0]:
-            stacked_observations[key] = torch.stack([obs[key] for obs in all_observations], dim=1)
-        ret["observation"] = stacked_observations
+        ret["observation"] = {key: buffer[:, : step + 1] for key, buffer in all_observations.items()}
 
     if hasattr(policy, "use_original_modules"):
         policy.use_original_modules()
@@ -217,6 +266,14 @@ def rollout(
     return ret
 
 
+def _write_observation(buffers: dict[str, Tensor], observation: dict[str, Tensor], step: int, length: int):
+    """Copy a batch of observations into (batch, length, *) buffers at `step`, allocating them if needed."""
+    for key, value in observation.items():
+        if key not in buffers:
+            buffers[key] = torch.empty((value.shape[0], length, *value.shape[1:]), dtype=value.dtype)
+        buffers[key][:, step] = value
+
+
 def eval_policy(
     env: gym.vector.VectorEnv,
     policy: PreTrainedPolicy,
@@ -225,6 +282,7 @@ def eval_policy(
     videos_dir: Path | None = None,
     return_episode_data: bool = False,
     start_seed: int | None = None,
+    overlap_rendering: bool = False,
 ) -> dict:
     """
     Args:
@@ -237,6 +295,8 @@ def eval_policy(
             the "episodes" key of the returned dictionary.
         start_seed: The first seed to use for the first individual rollout. For all subsequent rollouts the
             seed is incremented by 1. If not provided, the environments are not manually seeded.
+        overlap_rendering: Whether to render the frames on a background thread while the policy computes the
+            next action (SyncVectorEnv only). All the frames are rendered on the same thread.
     Returns:
         Dictionary with metrics and data regarding the rollouts.
     """
@@ -260,8 +320,17 @@ def eval_policy(
     max_rewards = []
     all_successes = []
     all_seeds = []
-    threads = []  # for video saving threads
+    # Videos are written in the background by a bounded pool of threads, so that encoding doesn't oversubscribe
+    # the CPU when many episodes are rendered.
+    video_executor = (
+        ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1)) if max_episodes_rendered > 0 else None
+    )
+    video_futures: list[Future] = []
     n_episodes_rendered = 0  # for saving the correct number of videos
+    # A single render thread for all the rollouts, as rendering contexts are bound to the thread that created them.
+    render_executor = (
+        ThreadPoolExecutor(max_workers=1) if overlap_rendering and max_episodes_rendered > 0 else None
+    )
 
     # Callback for visualization.
     def render_frame(env: gym.vector.VectorEnv):
@@ -279,10 +348,14 @@ def eval_policy(
         video_paths: list[str] = []
 
     if return_episode_data:
-        episode_data: dict | None = None
+        # The per-batch episode data is concatenated once at the end, rather than after every batch.
+        episode_data_chunks: list[dict] = []
+        next_data_index = 0
 
     # we dont want progress bar when we use slurm, since it clutters the logs
     progbar = trange(n_batches, desc="Stepping through eval batches", disable=inside_slurm())
+    # A single progress bar for the steps of all the rollouts.
+    rollout_progbar = tqdm(disable=inside_slurm(), leave=False)
     for batch_ix in progbar:
         # Cache frames for rendering videos. Each item will be (b, h, w, c), and the list indexes the rollout
         # step.
@@ -300,79 +373,80 @@ def eval_policy(
             policy,
             seeds=list(seeds) if seeds else None,
             return_observations=return_episode_data,
-            render_callback=render_frame if max_episodes_rendered > 0 else None,
+            # Skip rendering altogether once enough episodes have been rendered.
+            render_callback=render_frame if n_episodes_rendered < max_episodes_rendered else None,
+            progbar=rollout_progbar,
+            render_executor=render_executor,
         )
 
         # Figure out where in each rollout sequence the first done condition was encountered (results after
         # this won't be included).
         n_steps = rollout_data["done"].shape[1]
         # Note: this relies on a property of argmax: that it returns the first occurrence as a tiebreaker.
-        done_indices = torch.argmax(rollout_data["done"].to(int), dim=1)
+        done_indices = torch.argmax(rollout_data["done"].to(torch.uint8), dim=1)
 
         # Make a mask with shape (batch, n_steps) to mask out rollout data after the first done
         # (batch-element-wise). Note the `done_indices + 1` to make sure to keep the data from the done step.
-        mask = (torch.arange(n_steps) <= einops.repeat(done_indices + 1, "b -> b s", s=n_steps)).int()
-        # Extend metrics.
-        batch_sum_rewards = einops.reduce((rollout_data["reward"] * mask), "b n -> b", "sum")
-        sum_rewards.extend(batch_sum_rewards.tolist())
-        batch_max_rewards = einops.reduce((rollout_data["reward"] * mask), "b n -> b", "max")
-        max_rewards.extend(batch_max_rewards.tolist())
-        batch_successes = einops.reduce((rollout_data["success"] * mask), "b n -> b", "any")
-        all_successes.extend(batch_successes.tolist())
+        mask = torch.arange(n_steps) <= (done_indices + 1)[:, None]
+        # Extend metrics. The masked rewards are shared by the sum and the max.
+        masked_rewards = rollout_data["reward"] * mask
+        sum_rewards.extend(masked_rewards.sum(dim=1).tolist())
+        max_rewards.extend(masked_rewards.amax(dim=1).tolist())
+        all_successes.extend((rollout_data["success"] & mask).any(dim=1).tolist())
         if seeds:
             all_seeds.extend(seeds)
         else:
             all_seeds.append(None)
 
-        # FIXME: episode_data is either None or it doesn't exist
         if return_episode_data:
             this_episode_data = _compile_episode_data(
                 rollout_data,
                 done_indices,
                 start_episode_index=batch_ix * env.num_envs,
-                start_data_index=(0 if episode_data is None else (episode_data["index"][-1].item() + 1)),
+                start_data_index=next_data_index,
                 fps=env.unwrapped.metadata["render_fps"],
             )
-            if episode_data is None:
-                episode_data = this_episode_data
-            else:
+            if episode_data_chunks:
                 # Some sanity checks to make sure we are correctly compiling the data.
-                assert episode_data["episode_index"][-1] + 1 == this_episode_data["episode_index"][0]
-                assert episode_data["index"][-1] + 1 == this_episode_data["index"][0]
-                # Concatenate the episode data.
-                episode_data = {k: torch.cat([episode_data[k], this_episode_data[k]]) for k in episode_data}
+                last_episode_data = episode_data_chunks[-1]
+                assert last_episode_data["episode_index"][-1] + 1 == this_episode_data["episode_index"][0]
+                assert last_episode_data["index"][-1] + 1 == this_episode_data["index"][0]
+            episode_data_chunks.append(this_episode_data)
+            next_data_index += len(this_episode_data["index"])
 
         # Maybe render video for visualization.
         if max_episodes_rendered > 0 and len(ep_frames) > 0:
-            batch_stacked_frames = np.stack(ep_frames, axis=1)  # (b, t, *)
-            for stacked_frames, done_index in zip(
-                batch_stacked_frames, done_indices.flatten().tolist(), strict=False
-            ):
+            n_rendered_envs = len(ep_frames[0])
+            for ep_ix, done_index in enumerate(done_indices.flatten().tolist()[:n_rendered_envs]):
                 if n_episodes_rendered >= max_episodes_rendered:
                     break
 
                 videos_dir.mkdir(parents=True, exist_ok=True)
                 video_path = videos_dir / f"eval_episode_{n_episodes_rendered}.mp4"
                 video_paths.append(str(video_path))
-                thread = threading.Thread(
-                    target=write_video,
-                    args=(
-                        str(video_path),
-                        stacked_frames[: done_index + 1],  # + 1 to capture the last observation
-                        env.unwrapped.metadata["render_fps"],
-                    ),
+                # Pass the episode's frames as views of the per-step renders, rather than first stacking the
+                # whole batch of videos into a new array. + 1 to capture the last observation.
+                frames = [step_frames[ep_ix] for step_frames in ep_frames[: done_index + 1]]
+                video_futures.append(
+                    video_executor.submit(
+                        write_video, str(video_path), frames, env.unwrapped.metadata["render_fps"]
+                    )
                 )
-                thread.start()
-                threads.append(thread)
                 n_episodes_rendered += 1
 
         progbar.set_postfix(
             {"running_success_rate": f"{np.mean(all_successes[:n_episodes]).item() * 100:.1f}%"}
         )
 
-    # Wait till all video rendering threads are done.
-    for thread in threads:
-        thread.join()
+    rollout_progbar.close()
+    if render_executor is not None:
+        render_executor.shutdown()
+
+    # Wait till all videos are written.
+    for future in video_futures:
+        future.result()
+    if video_executor is not None:
+        video_executor.shutdown()
 
     # Compile eval info.
     info = {
@@ -404,7 +478,9 @@ def eval_policy(
     }
 
     if return_episode_data:
-        info["episodes"] = episode_data
+        info["episodes"] = {
+            k: torch.cat([chunk[k] for chunk in episode_data_chunks]) for k in episode_data_chunks[0]
+        }
 
     if max_episodes_rendered > 0:
         info["video_paths"] = video_paths
@@ -421,36 +497,29 @@ def _compile_episode_data(
 
     Similar logic is implemented when datasets are pushed to hub (see: `push_to_hub`).
     """
-    ep_dicts = []
-    total_frames = 0
-    for ep_ix in range(rollout_data["action"].shape[0]):
-        # + 2 to include the first done frame and the last observation frame.
-        num_frames = done_indices[ep_ix].item() + 2
-        total_frames += num_frames
-
-        # Here we do `num_frames - 1` as we don't want to include the last observation frame just yet.
-        ep_dict = {
-            "action": rollout_data["action"][ep_ix, : num_frames - 1],
-            "episode_index": torch.tensor([start_episode_index + ep_ix] * (num_frames - 1)),
-            "frame_index": torch.arange(0, num_frames - 1, 1),
-            "timestamp": torch.arange(0, num_frames - 1, 1) / fps,
-            "next.done": rollout_data["done"][ep_ix, : num_frames - 1],
-            "next.success": rollout_data["success"][ep_ix, : num_frames - 1],
-            "next.reward": rollout_data["reward"][ep_ix, : num_frames - 1].type(torch.float32),
-        }
-
-        # For the last observation frame, all other keys will just be copy padded.
-        for k in ep_dict:
-            ep_dict[k] = torch.cat([ep_dict[k], ep_dict[k][-1:]])
-
-        for key in rollout_data["observation"]:
-            ep_dict[key] = rollout_data["observation"][key][ep_ix, :num_frames]
-
-        ep_dicts.append(ep_dict)
-
-    data_dict = {}
-    for key in ep_dicts[0]:
-        data_dict[key] = torch.cat([x[key] for x in ep_dicts])
+    # + 2 to include the first done frame and the last observation frame.
+    num_frames = done_indices + 2
+    total_frames = num_frames.sum().item()
+
+    # For each output frame, gather its episode (i.e. its index in the batch) and its step in the rollout.
+    ep_ixs = torch.repeat_interleave(torch.arange(len(num_frames)), num_frames)
+    ep_starts = torch.cumsum(num_frames, dim=0) - num_frames
+    frame_ixs = torch.arange(total_frames) - torch.repeat_interleave(ep_starts, num_frames)
+    # There is no action (etc.) for the last observation frame of each episode, so all keys but the
+    # observations are copy padded from the frame before.
+    step_ixs = torch.minimum(frame_ixs, torch.repeat_interleave(num_frames - 2, num_frames))
+
+    data_dict = {
+        "action": rollout_data["action"][ep_ixs, step_ixs],
+        "episode_index": start_episode_index + ep_ixs,
+        "frame_index": step_ixs,
+        "timestamp": step_ixs / fps,
+        "next.done": rollout_data["done"][ep_ixs, step_ixs],
+        "next.success": rollout_data["success"][ep_ixs, step_ixs],
+        "next.reward": rollout_data["reward"][ep_ixs, step_ixs].type(torch.float32),
+    }
+    for key in rollout_data["observation"]:
+        data_dict[key] = rollout_data["observation"][key][ep_ixs, frame_ixs]
 
     data_dict["index"] = torch.arange(start_data_index, start_data_index + total_frames, 1)
 
@@ -481,7 +550,23 @@ def eval_main(cfg: EvalPipelineConfig):
     )
     policy.eval()
 
-    with torch.no_grad(), torch.autocast(device_type=device.type) if cfg.policy.use_amp else nullcontext():
+    if cfg.eval.dynamic_quantization:
+        if device.type != "cpu":
+            raise ValueError(
+                f"`eval.dynamic_quantization` is only supported on CPU, but the device is '{device}'."
+            )
+        logging.info("Quantizing the policy's linear layers to int8.")
+        torch.ao.quantization.quantize_dynamic(policy, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    if getattr(cfg.policy, "compile_model", False):
+        # Trigger the compilation ahead of the (timed) evaluation, with a batch of the same shape as the rollouts'.
+        logging.info("Warming up policy.")
+        observation, _ = env.reset(seed=cfg.seed)
+        observation = add_envs_task(env, preprocess_observation(observation, device=device))
+        with torch.inference_mode(), torch.autocast(device.type) if cfg.policy.use_amp else nullcontext():
+            policy.select_action(observation)
+
+    with torch.no_grad():
         info = eval_policy(
             env,
             policy,
@@ -489,6 +574,7 @@ def eval_main(cfg: EvalPipelineConfig):
             max_episodes_rendered=10,
             videos_dir=Path(cfg.output_dir) / "videos",
             start_seed=cfg.seed,
+            overlap_rendering=cfg.eval.overlap_rendering,
         )
     print(info["aggregated"])
 
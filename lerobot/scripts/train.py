@@ -248,10 +248,7 @@ def train(cfg: TrainPipelineConfig):
         if cfg.env and is_eval_step:
             step_id = get_step_identifier(step, cfg.steps)
             logging.info(f"Eval policy at step {step}")
-            with (
-                torch.no_grad(),
-                torch.autocast(device_type=device.type) if cfg.policy.use_amp else nullcontext(),
-            ):
+            with torch.no_grad():
                 eval_info = eval_policy(
                     eval_env,
                     policy,
@@ -259,6 +256,7 @@ def train(cfg: TrainPipelineConfig):
                     videos_dir=cfg.output_dir / "eval" / f"videos_step_{step_id}",
                     max_episodes_rendered=4,
                     start_seed=cfg.seed,
+                    overlap_rendering=cfg.eval.overlap_rendering,
                 )
 
             eval_metrics = {
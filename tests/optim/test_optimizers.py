@@ -54,3 +54,18 @@ def test_save_and_load_optimizer_state(model_params, optimizer, tmp_path):
     loaded_optimizer = load_optimizer_state(loaded_optimizer, tmp_path)
 
     torch.testing.assert_close(optimizer.state_dict(), loaded_optimizer.state_dict())
+
+
+def test_save_and_load_optimizer_state_channels_last(tmp_path):
+    model = torch.nn.Conv2d(3, 8, kernel_size=3).to(memory_format=torch.channels_last)
+    optimizer = AdamConfig().build(model.parameters())
+    model(torch.randn(2, 3, 8, 8)).sum().backward()
+    optimizer.step()
+    # The optimizer state inherits the memory format of the weights.
+    assert not optimizer.state_dict()["state"][0]["exp_avg"].is_contiguous()
+
+    save_optimizer_state(optimizer, tmp_path)
+    loaded_optimizer = AdamConfig().build(model.parameters())
+    loaded_optimizer = load_optimizer_state(loaded_optimizer, tmp_path)
+
+    torch.testing.assert_close(optimizer.state_dict(), loaded_optimizer.state_dict())
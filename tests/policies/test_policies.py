@@ -18,10 +18,13 @@ from copy import deepcopy
 from pathlib import Path
 
 import einops
+import numpy as np
 import pytest
 import torch
+from diffusers.schedulers.scheduling_dpmsolver_multistep import DPMSolverMultistepScheduler
+from diffusers.schedulers.scheduling_edm_euler import EDMEulerScheduler
 from packaging import version
-from safetensors.torch import load_file
+from safetensors.torch import load_file, save_file
 
 from lerobot import available_policies
 from lerobot.common.datasets.factory import make_dataset
@@ -30,15 +33,21 @@ from lerobot.common.envs.factory import make_env, make_env_config
 from lerobot.common.envs.utils import preprocess_observation
 from lerobot.common.optim.factory import make_optimizer_and_scheduler
 from lerobot.common.policies.act.modeling_act import ACTTemporalEnsembler
+from lerobot.common.policies.diffusion.modeling_diffusion import (
+    DiffusionConv1dBlock,
+    DiffusionPolicy,
+    SpatialSoftmax,
+)
 from lerobot.common.policies.factory import (
     get_policy_class,
     make_policy,
     make_policy_config,
 )
-from lerobot.common.policies.normalize import Normalize, Unnormalize
+from lerobot.common.policies.normalize import Normalize, Unnormalize, load_stats
 from lerobot.common.policies.pretrained import PreTrainedPolicy
 from lerobot.common.utils.random_utils import seeded_context
 from lerobot.configs.default import DatasetConfig
+from lerobot.configs.policies import PreTrainedConfig
 from lerobot.configs.train import TrainPipelineConfig
 from lerobot.configs.types import FeatureType, NormalizationMode, PolicyFeature
 from tests.artifacts.policies.save_policy_to_safetensors import get_policy_stats
@@ -260,6 +269,85 @@ def test_save_and_load_pretrained(dummy_dataset_metadata, tmp_path, policy_name:
     torch.testing.assert_close(list(policy.parameters()), list(loaded_policy.parameters()), rtol=0, atol=0)
 
 
+@pytest.mark.parametrize("suffix", [".safetensors", ".npz"])
+def test_load_stats(tmp_path, suffix):
+    # "action" only holds min/max, as written for min_max normalized features.
+    flat_stats = {
+        "observation.state/mean": torch.randn(6),
+        "observation.state/std": torch.rand(6) + 0.1,
+        "action/min": -torch.rand(6),
+        "action/max": torch.rand(6),
+    }
+    path = tmp_path / f"stats{suffix}"
+    if suffix == ".npz":
+        np.savez(path, **{k: v.numpy() for k, v in flat_stats.items()})
+    else:
+        save_file(flat_stats, path)
+
+    stats = load_stats(str(path))
+
+    assert set(stats) == {"observation.state", "action"}
+    assert set(stats["action"]) == {"min", "max"}
+    for flat_key, value in flat_stats.items():
+        key, stat = flat_key.rsplit("/", 1)
+        torch.testing.assert_close(torch.as_tensor(stats[key][stat]), value)
+
+    features = {"action": PolicyFeature(type=FeatureType.ACTION, shape=(6,))}
+    normalize = Normalize(features, {"ACTION": NormalizationMode.MIN_MAX}, stats)
+    torch.testing.assert_close(normalize.buffer_action["min"], flat_stats["action/min"])
+    torch.testing.assert_close(normalize.buffer_action["max"], flat_stats["action/max"])
+
+    with pytest.raises(FileNotFoundError):
+        load_stats(str(tmp_path / f"missing{suffix}"))
+
+    with pytest.raises(ValueError, match=rf"{path}.*'observation.image'"):
+        load_stats(str(path), required_keys=["observation.state", "observation.image"])
+
+
+def test_diffusion_load_pretrained_without_stats_file(dummy_dataset_metadata, tmp_path):
+    """The stats files are only needed to create a policy from scratch, not to load a pretrained one."""
+    stats_path = tmp_path / "stats.safetensors"
+    stats = {
+        "observation.images.laptop/mean": torch.rand(3, 1, 1),
+        "observation.images.laptop/std": torch.rand(3, 1, 1) + 0.1,
+        "observation.state/min": -torch.rand(6),
+        "observation.state/max": torch.rand(6),
+    }
+    save_file(stats, stats_path)
+    policy_cfg = make_policy_config("diffusion", down_dims=(64, 128), input_stats_path=str(stats_path))
+    features = dataset_to_policy_features(dummy_dataset_metadata.features)
+    policy_cfg.output_features = {key: ft for key, ft in features.items() if ft.type is FeatureType.ACTION}
+    policy_cfg.input_features = {
+        key: ft for key, ft in features.items() if key not in policy_cfg.output_features
+    }
+    policy = DiffusionPolicy(policy_cfg)
+    save_dir = tmp_path / "pretrained"
+    policy.save_pretrained(save_dir)
+    stats_path.unlink()
+
+    loaded_cfg = PreTrainedConfig.from_pretrained(save_dir)
+    loaded_policy = DiffusionPolicy.from_pretrained(save_dir, config=loaded_cfg)
+    torch.testing.assert_close(
+        loaded_policy.normalize_inputs.buffer_observation_state["min"],
+        policy.normalize_inputs.buffer_observation_state["min"],
+    )
+
+
+def test_diffusion_stats_file_missing_feature(dummy_dataset_metadata, tmp_path):
+    """A stats file lacking a normalized feature must be reported when the policy is created."""
+    stats_path = tmp_path / "stats.safetensors"
+    save_file({"observation.state/min": -torch.rand(6), "observation.state/max": torch.rand(6)}, stats_path)
+    policy_cfg = make_policy_config("diffusion", down_dims=(64, 128), input_stats_path=str(stats_path))
+    features = dataset_to_policy_features(dummy_dataset_metadata.features)
+    policy_cfg.output_features = {key: ft for key, ft in features.items() if ft.type is FeatureType.ACTION}
+    policy_cfg.input_features = {
+        key: ft for key, ft in features.items() if key not in policy_cfg.output_features
+    }
+
+    with pytest.raises(ValueError, match=rf"{stats_path}.*'observation.images.laptop'"):
+        DiffusionPolicy(policy_cfg)
+
+
 @pytest.mark.parametrize("insert_temporal_dim", [False, True])
 def test_normalize(insert_temporal_dim):
     """
@@ -492,3 +580,220 @@ def test_act_temporal_ensembler():
         assert torch.all(offline_avg <= einops.reduce(seq_slice, "b s 1 -> b 1", "max"))
         # Selected atol=1e-4 keeping in mind actions in [-1, 1] and excepting 0.01% error.
         torch.testing.assert_close(online_avg, offline_avg, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "noise_scheduler_type, num_inference_steps, expected",
+    [("DDPM", None, 100), ("DDIM", None, 10), ("DDIM", 25, 25)],
+)
+def test_diffusion_num_inference_steps_default(noise_scheduler_type, num_inference_steps, expected):
+    policy_cfg = make_policy_config(
+        "diffusion", noise_scheduler_type=noise_scheduler_type, num_inference_steps=num_inference_steps
+    )
+    assert policy_cfg.num_inference_steps == expected
+
+
+def test_diffusion_num_inference_steps_validation():
+    with pytest.raises(ValueError, match="num_inference_steps"):
+        make_policy_config("diffusion", num_train_timesteps=100, num_inference_steps=101)
+
+
+def _make_small_diffusion_policy(**policy_kwargs) -> DiffusionPolicy:
+    """A small diffusion policy on one 96x96 camera and a 2D state / action, with stats in [-1, 1]."""
+    policy_cfg = make_policy_config(
+        "diffusion", device="cpu", down_dims=(64, 128), crop_shape=(80, 80), **policy_kwargs
+    )
+    policy_cfg.input_features = {
+        "observation.image": PolicyFeature(type=FeatureType.VISUAL, shape=(3, 96, 96)),
+        "observation.state": PolicyFeature(type=FeatureType.STATE, shape=(2,)),
+    }
+    policy_cfg.output_features = {"action": PolicyFeature(type=FeatureType.ACTION, shape=(2,))}
+    stats = {
+        "observation.image": {"mean": torch.zeros(3, 1, 1), "std": torch.ones(3, 1, 1)},
+        "observation.state": {"min": -torch.ones(2), "max": torch.ones(2)},
+        "action": {"min": -torch.ones(2), "max": torch.ones(2)},
+    }
+    return DiffusionPolicy(policy_cfg, dataset_stats=stats)
+
+
+@pytest.mark.parametrize(
+    "policy_kwargs",
+    [
+        {"use_edm_preconditioning": True, "beta_schedule": "edm_karras"},
+        {"timestep_sampling": "lognormal"},
+        {"timestep_sampling": "normal"},
+        {"use_edm_preconditioning": True, "beta_schedule": "edm_karras", "timestep_sampling": "lognormal"},
+        {"noise_scheduler_type": "DPMSolverMultistep"},
+    ],
+)
+def test_diffusion_training_and_inference(policy_kwargs):
+    """Smoke test for the optional diffusion training / sampling paths: one training step and one action."""
+    policy = _make_small_diffusion_policy(**policy_kwargs)
+    policy_cfg = policy.config
+
+    batch_size = 2
+    batch = {
+        "observation.image": torch.rand(batch_size, policy_cfg.n_obs_steps, 3, 96, 96),
+        "observation.state": torch.rand(batch_size, policy_cfg.n_obs_steps, 2),
+        "action": torch.rand(batch_size, policy_cfg.horizon, 2),
+        "action_is_pad": torch.zeros(batch_size, policy_cfg.horizon, dtype=torch.bool),
+    }
+    loss, _ = policy.forward(batch)
+    loss.backward()
+    assert torch.isfinite(loss)
+
+    policy.eval()
+    policy.reset()
+    with torch.inference_mode():
+        action = policy.select_action(
+            {"observation.image": torch.rand(1, 3, 96, 96), "observation.state": torch.rand(1, 2)}
+        )
+    assert action.shape == (1, 2)
+    assert torch.isfinite(action).all()
+
+
+@pytest.mark.parametrize(
+    "policy_kwargs",
+    [{}, {"use_edm_preconditioning": True, "beta_schedule": "edm_karras"}],
+)
+def test_diffusion_precompute_timestep_embeddings(policy_kwargs):
+    """Precomputing the timestep embeddings must not change the sampled actions (DDPM and EDM timesteps)."""
+    policy = _make_small_diffusion_policy(precompute_timestep_embeddings=True, **policy_kwargs)
+    policy.eval()
+    batch_size, n_obs_steps = 2, policy.config.n_obs_steps
+    batch = {
+        "observation.state": torch.rand(batch_size, n_obs_steps, 2),
+        "observation.images": torch.rand(batch_size, n_obs_steps, 1, 3, 96, 96),
+    }
+
+    actions = {}
+    for precompute in [True, False]:
+        # The config is shared with the diffusion model, so this switches its sampling path.
+        policy.config.precompute_timestep_embeddings = precompute
+        torch.manual_seed(0)
+        with torch.no_grad():
+            actions[precompute] = policy.diffusion.generate_actions(batch)
+
+    assert actions[True].shape == (batch_size, policy.config.n_action_steps, 2)
+    torch.testing.assert_close(actions[True], actions[False], rtol=0, atol=1e-5)
+
+
+def test_diffusion_edm_loss(monkeypatch):
+    """The EDM prediction / target pair must give the λ(σ)-weighted denoiser loss of the EDM paper."""
+    policy = _make_small_diffusion_policy(use_edm_preconditioning=True, beta_schedule="edm_karras")
+    scheduler = policy.diffusion.noise_scheduler
+    assert isinstance(scheduler, EDMEulerScheduler)
+    # The prior is drawn at sigma_max rather than at unit variance.
+    assert scheduler.init_noise_sigma != 1
+
+    # Float64 so that the reference at sigma_min does not drown in rounding errors.
+    policy.double()
+    policy.eval()
+    batch_size, sigma_data = 2, policy.config.sigma_data
+    # The lowest and highest noise levels map to the ends of the Karras ramp.
+    monkeypatch.setattr(
+        policy.diffusion, "_sample_noise_levels", lambda *_: torch.tensor([0.0, 1.0], dtype=torch.float64)
+    )
+    sigmas = torch.tensor([scheduler.config.sigma_min, scheduler.config.sigma_max], dtype=torch.float64)
+    trajectory = torch.rand(batch_size, policy.config.horizon, 2, dtype=torch.float64) * 2 - 1
+    eps = torch.randn_like(trajectory)
+
+    with torch.no_grad():
+        global_cond = policy.diffusion._prepare_global_conditioning(
+            {
+                "observation.state": torch.rand(
+                    batch_size, policy.config.n_obs_steps, 2, dtype=torch.float64
+                ),
+                "observation.images": torch.rand(
+                    batch_size, policy.config.n_obs_steps, 1, 3, 96, 96, dtype=torch.float64
+                ),
+            }
+        )
+        pred, target = policy.diffusion._edm_prediction_and_target(trajectory, eps, global_cond)
+
+        sigmas_bcast = sigmas[:, None, None]
+        noisy_trajectory = trajectory + eps * sigmas_bcast
+        c_skip = sigma_data**2 / (sigmas_bcast**2 + sigma_data**2)
+        c_out = sigmas_bcast * sigma_data / (sigmas_bcast**2 + sigma_data**2) ** 0.5
+        c_in = 1 / (sigmas_bcast**2 + sigma_data**2) ** 0.5
+        denoised = c_skip * noisy_trajectory + c_out * policy.diffusion.unet(
+            c_in * noisy_trajectory, 0.25 * torch.log(sigmas), global_cond=global_cond
+        )
+        weight = (sigmas_bcast**2 + sigma_data**2) / (sigmas_bcast * sigma_data) ** 2
+        expected_loss = weight * (denoised - trajectory) ** 2
+
+    torch.testing.assert_close((pred - target) ** 2, expected_loss)
+
+
+@pytest.mark.parametrize("timestep_sampling", ["lognormal", "normal"])
+def test_diffusion_timestep_sampling(timestep_sampling, monkeypatch):
+    """The non-uniform timestep samplers must stay in range and favor the lower noise levels."""
+    policy = _make_small_diffusion_policy(timestep_sampling=timestep_sampling)
+    num_train_timesteps = policy.config.num_train_timesteps
+    torch.manual_seed(0)
+
+    noise_levels = policy.diffusion._sample_noise_levels(10_000, torch.device("cpu"))
+    assert noise_levels.min() >= 0 and noise_levels.max() <= 1
+    # Half of the levels would be below 0.5 if they were uniform (± 0.005 for one standard deviation).
+    assert (noise_levels < 0.5).float().mean() > 0.55
+
+    # Capture the timesteps that the training loss noises the actions at.
+    add_noise = policy.diffusion.noise_scheduler.add_noise
+    sampled_timesteps = []
+
+    def capture_add_noise(original_samples, noise, timesteps):
+        sampled_timesteps.append(timesteps)
+        return add_noise(original_samples, noise, timesteps)
+
+    monkeypatch.setattr(policy.diffusion.noise_scheduler, "add_noise", capture_add_noise)
+    batch_size = 16
+    policy.forward(
+        {
+            "observation.image": torch.rand(batch_size, policy.config.n_obs_steps, 3, 96, 96),
+            "observation.state": torch.rand(batch_size, policy.config.n_obs_steps, 2),
+            "action": torch.rand(batch_size, policy.config.horizon, 2),
+            "action_is_pad": torch.zeros(batch_size, policy.config.horizon, dtype=torch.bool),
+        }
+    )
+    (timesteps,) = sampled_timesteps
+    assert timesteps.dtype == torch.long
+    assert timesteps.min() >= 0 and timesteps.max() < num_train_timesteps
+
+
+@pytest.mark.parametrize("solver_order", [1, 3])
+def test_diffusion_dpm_solver_scheduler(solver_order):
+    """The DPM-Solver++ scheduler must take the configured order and none of the sample clipping options."""
+    policy = _make_small_diffusion_policy(
+        noise_scheduler_type="DPMSolverMultistep", solver_order=solver_order
+    )
+    scheduler = policy.diffusion.noise_scheduler
+    assert isinstance(scheduler, DPMSolverMultistepScheduler)
+    assert scheduler.config.solver_order == solver_order
+    assert "clip_sample" not in scheduler.config
+    assert "clip_sample_range" not in scheduler.config
+
+
+def test_diffusion_fused_group_norm():
+    """The compiled group norm + Mish must match the eager block, including across batch and channel sizes."""
+    torch.manual_seed(0)
+    for channels, horizon in [(32, 16), (64, 8)]:
+        block = DiffusionConv1dBlock(channels, channels, kernel_size=5, n_groups=8, fused_group_norm=True)
+        for batch_size in [4, 3, 1]:
+            x = torch.randn(batch_size, channels, horizon)
+            with torch.no_grad():
+                fused = block(x)
+                block.fused_group_norm = False
+                eager = block(x)
+                block.fused_group_norm = True
+            torch.testing.assert_close(fused, eager, rtol=1e-4, atol=1e-4)
+
+
+def test_diffusion_fused_spatial_softmax():
+    torch.manual_seed(0)
+    fused_pool = SpatialSoftmax((16, 3, 4), num_kp=8, fused=True)
+    eager_pool = SpatialSoftmax((16, 3, 4), num_kp=8, fused=False)
+    eager_pool.load_state_dict(fused_pool.state_dict())
+    for batch_size in [4, 3, 1]:
+        x = torch.randn(batch_size, 16, 3, 4)
+        with torch.no_grad():
+            torch.testing.assert_close(fused_pool(x), eager_pool(x), rtol=1e-4, atol=1e-4)
@@ -0,0 +1,52 @@
+import torch
+
+from lerobot.scripts.eval import _compile_episode_data
+
+
+def test_compile_episode_data():
+    batch_size, n_steps, fps = 3, 6, 10
+    # Episodes end at different steps, including on the first and on the last one.
+    done_indices = torch.tensor([2, 0, 5])
+    done = torch.arange(n_steps)[None] >= done_indices[:, None]
+    rollout_data = {
+        "action": torch.arange(batch_size * n_steps * 2, dtype=torch.float32).reshape(batch_size, n_steps, 2),
+        "reward": torch.arange(batch_size * n_steps, dtype=torch.float64).reshape(batch_size, n_steps),
+        "success": done & (torch.arange(batch_size)[:, None] != 1),
+        "done": done,
+        # Observations have an extra step for the observation following the last action.
+        "observation": {
+            "observation.state": torch.arange(batch_size * (n_steps + 1) * 4).reshape(
+                batch_size, n_steps + 1, 4
+            ),
+        },
+    }
+
+    data = _compile_episode_data(
+        rollout_data, done_indices, start_episode_index=5, start_data_index=100, fps=fps
+    )
+
+    offset = 0
+    for ep_ix in range(batch_size):
+        # Each episode holds the steps up to (and including) the first done, plus the last observation frame.
+        num_frames = done_indices[ep_ix].item() + 2
+        ep_slice = slice(offset, offset + num_frames)
+        # All keys but the observations are copy padded from the frame before for the last observation frame.
+        steps = torch.cat([torch.arange(num_frames - 1), torch.tensor([num_frames - 2])])
+        torch.testing.assert_close(data["action"][ep_slice], rollout_data["action"][ep_ix, steps])
+        torch.testing.assert_close(
+            data["next.reward"][ep_slice], rollout_data["reward"][ep_ix, steps].float()
+        )
+        assert torch.equal(data["next.done"][ep_slice], rollout_data["done"][ep_ix, steps])
+        assert torch.equal(data["next.success"][ep_slice], rollout_data["success"][ep_ix, steps])
+        assert torch.equal(data["episode_index"][ep_slice], torch.full((num_frames,), 5 + ep_ix))
+        assert torch.equal(data["frame_index"][ep_slice], steps)
+        torch.testing.assert_close(data["timestamp"][ep_slice], steps / fps)
+        assert torch.equal(
+            data["observation.state"][ep_slice],
+            rollout_data["observation"]["observation.state"][ep_ix, :num_frames],
+        )
+        offset += num_frames
+
+    assert data["next.reward"].dtype == torch.float32
+    assert torch.equal(data["index"], torch.arange(100, 100 + offset))
+    assert all(len(v) == offset for v in data.values())